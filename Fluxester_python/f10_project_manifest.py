@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from f13_dead_band_detector import parse_dead_band
+
+# Version of the manifest layout, stored in the file to detect incompatible manifests
+MANIFEST_VERSION = 1
+
+
+def get_manifest_path(input_path, output_folder="./data"):
+    """
+    Returns the path of the project manifest belonging to an input file.
+
+    The name includes a hash of the absolute input path, so files with the same name in
+    different folders get their own manifest.
+
+    Args:
+        input_path (str): The path of the analyzer data file.
+        output_folder (str): Folder where the figures, summaries and manifest are saved.
+
+    Returns:
+        str: The manifest path, e.g. './data/gas_log.txt.3f2a9c41d07b.manifest.json'.
+    """
+    path_hash = hashlib.sha256(os.path.abspath(input_path).encode()).hexdigest()[:12]
+    return os.path.join(output_folder, f"{os.path.basename(input_path)}.{path_hash}.manifest.json")
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 hash of a file's content, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_manifest(input_path, columns, dead_band):
+    """
+    Creates an empty manifest for an input file and column mapping.
+
+    Args:
+        input_path (str): The path of the analyzer data file.
+        columns (dict): Role -> column name, e.g. {'date': ..., 'time': ..., 'y_axis': ..., 'co2': ...}.
+        dead_band (int or str): The dead band value in seconds, or 'auto'.
+
+    Returns:
+        dict: The manifest.
+    """
+    return {
+        'version': MANIFEST_VERSION,
+        'inputs': [{'path': os.path.abspath(input_path), 'sha256': file_sha256(input_path)}],
+        'columns': dict(columns),
+        'dead_band': parse_dead_band(dead_band),
+        'closures': [],
+    }
+
+
+def load_manifest(manifest_path):
+    """
+    Loads a manifest, returning None if it does not exist or cannot be used.
+    """
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, manifest_path):
+    """
+    Writes the manifest atomically, so an interrupted save never leaves a truncated file behind.
+    """
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(_to_json_value(manifest), file, indent=2, allow_nan=False)
+    os.replace(temp_path, manifest_path)
+
+
+def _to_json_value(value):
+    # NumPy scalars, timestamps and missing values found in the closure summaries; NaN is not valid JSON
+    if isinstance(value, dict):
+        return {key: _to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(item) for item in value]
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+
+def select_closure_rows(df, selections, y_axis_col):
+    """
+    Returns the rows of the dataset covered by one or more rectangle selections.
+
+    Args:
+        df (DataFrame): The dataset, including the 'datetime' column.
+        selections (list): [start_time, end_time, y_min, y_max] of each rectangle; times are ISO strings or timestamps.
+        y_axis_col (str): The name of the column plotted on the y-axis.
+
+    Returns:
+        Index: The index labels of the selected rows, in ascending order.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    for start_time, end_time, y_min, y_max in selections:
+        mask |= ((df['datetime'] >= pd.Timestamp(start_time)) & (df['datetime'] <= pd.Timestamp(end_time)) &
+                 (df[y_axis_col] >= y_min) & (df[y_axis_col] <= y_max)).to_numpy()
+    return df.index[mask].sort_values()
+
+
+def closure_fingerprint(selected_data, columns, dead_band, window_size):
+    """
+    Hashes everything a closure result depends on: the selected rows and the processing parameters.
+
+    Args:
+        selected_data (DataFrame): The rows of the closure.
+        columns (dict): The column mapping.
+        dead_band (int or str): The dead band value in seconds, or 'auto'.
+        window_size (int): The moving window size.
+
+    Returns:
+        str: A hex digest that changes whenever the data or a parameter changes.
+    """
+    digest = hashlib.sha256()
+    parameters = {'columns': columns, 'dead_band': parse_dead_band(dead_band), 'window_size': int(window_size)}
+    digest.update(json.dumps(parameters, sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(selected_data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def plan_recompute(manifest, df, input_path, columns, dead_band):
+    """
+    Splits the closures of a manifest into those that can be loaded and those that must be recomputed.
+
+    A closure is finished once it has results or a recorded error (e.g. too little data after
+    the dead band); failed closures are only retried when their fingerprint changes. When the
+    input file, the column mapping and the dead band are all unchanged, every finished closure
+    is reused without rehashing its rows. Otherwise each closure is re-selected from the current
+    data and only those whose fingerprint changed are returned for recomputation.
+
+    Args:
+        manifest (dict): The loaded manifest.
+        df (DataFrame): The current dataset, including the 'datetime' column.
+        input_path (str): The path of the current analyzer data file.
+        columns (dict): The current column mapping.
+        dead_band (int or str): The current dead band value in seconds, or 'auto'.
+
+    Returns:
+        list: (closure position, selected rows, fingerprint) of each closure to recompute.
+    """
+    file_hash = file_sha256(input_path)
+    unchanged = (
+        [entry['sha256'] for entry in manifest['inputs']] == [file_hash]
+        and manifest['columns'] == dict(columns)
+        and manifest['dead_band'] == parse_dead_band(dead_band)
+    )
+
+    stale = []
+    for position, closure in enumerate(manifest['closures']):
+        finished = closure.get('results') is not None or closure.get('error') is not None
+        if unchanged and finished:
+            continue
+        selected_data = df.loc[select_closure_rows(df, closure['selections'], columns['y_axis'])].copy()
+        fingerprint = closure_fingerprint(selected_data, columns, dead_band, closure['window_size'])
+        if not finished or fingerprint != closure['fingerprint']:
+            stale.append((position, selected_data, fingerprint))
+
+    # The manifest now describes the current input and parameters
+    manifest['inputs'] = [{'path': os.path.abspath(input_path), 'sha256': file_hash}]
+    manifest['columns'] = dict(columns)
+    manifest['dead_band'] = parse_dead_band(dead_band)
+    return stale
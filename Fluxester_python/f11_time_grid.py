@@ -0,0 +1,150 @@
+import numpy as np
+
+from f9_closure_window import ClosureWindow
+
+# Longest run of missing seconds tolerated inside a moving window
+DEFAULT_MAX_GAP_SECONDS = 5.0
+# Logging intervals of the supported analyzers, in seconds
+NOMINAL_TIME_STEPS = np.array([0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0])
+
+
+def infer_time_step(elapsed):
+    """
+    Infers the grid step of a closure from its sampling intervals.
+
+    The median of the positive intervals is snapped to the nearest nominal logging interval
+    (on a log scale), so timestamp jitter does not change the step and dropped samples only
+    leave empty cells as long as most intervals are regular. In a log mixing 1 Hz and 10 Hz
+    records the rate holding most of the samples sets the step: faster samples are averaged
+    into its cells, slower ones leave empty cells between them.
+
+    Args:
+        elapsed (ndarray): Elapsed seconds of the samples.
+
+    Returns:
+        float: The grid step in seconds.
+    """
+    intervals = np.diff(np.sort(elapsed))
+    intervals = intervals[intervals > 0]
+    if len(intervals) == 0:
+        return 1.0
+    median = float(np.median(intervals))
+    if median > NOMINAL_TIME_STEPS[-1]:
+        return round(median, 1)
+    return float(NOMINAL_TIME_STEPS[np.argmin(np.abs(np.log(NOMINAL_TIME_STEPS / median)))])
+
+
+def grid_cells(elapsed, grid_start, step):
+    """
+    Assigns every sample to the grid cell whose center is closest to it.
+
+    Args:
+        elapsed (ndarray): Elapsed seconds of the samples.
+        grid_start (float): Elapsed seconds of the center of the first cell.
+        step (float): The grid step in seconds.
+
+    Returns:
+        ndarray: The cell number of every sample.
+    """
+    return np.rint((elapsed - grid_start) / step).astype(np.int64)
+
+
+def describe_time_irregularities(elapsed, step):
+    """
+    Counts duplicated timestamps and gaps of a closure.
+
+    Args:
+        elapsed (ndarray): Elapsed seconds of the samples.
+        step (float): The grid step in seconds.
+
+    Returns:
+        dict: The number of duplicated timestamps, the number of gaps longer than one step,
+        and the longest gap in seconds.
+    """
+    intervals = np.diff(np.sort(elapsed))
+    gaps = intervals[intervals > 1.5 * step]
+    return {
+        'duplicates': int((intervals == 0).sum()),
+        'gaps': int(len(gaps)),
+        'longest_gap': float(gaps.max()) if len(gaps) else 0.0,
+    }
+
+
+def regularize_closure(closure, step=None):
+    """
+    Aggregates a closure onto a regular time grid with a validity mask.
+
+    Samples falling into the same grid cell (duplicated timestamps or faster logging) are
+    averaged; cells without any sample are marked invalid and hold NaN. All columns are binned
+    with a single np.bincount each, so no Python loop runs over the samples.
+
+    Args:
+        closure (ClosureWindow): The raw closure, in any order.
+        step (float): The grid step in seconds. Inferred from the data when None.
+
+    Returns:
+        ClosureWindow: The gridded closure; `elapsed` is evenly spaced and `valid` marks the filled cells.
+    """
+    step = infer_time_step(closure.elapsed) if step is None else step
+    cells = grid_cells(closure.elapsed, closure.elapsed.min(), step)
+    n_cells = int(cells.max()) + 1
+
+    counts = np.bincount(cells, minlength=n_cells)
+    gases = {}
+    for col, values in closure.gases.items():
+        finite = np.isfinite(values)
+        sums = np.bincount(cells, weights=np.where(finite, values, 0.0), minlength=n_cells)
+        finite_counts = np.bincount(cells, weights=finite, minlength=n_cells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gases[col] = np.where(finite_counts > 0, sums / finite_counts, np.nan)
+
+    elapsed = closure.elapsed.min() + np.arange(n_cells) * step
+    return ClosureWindow(closure.origin, elapsed, gases, valid=counts > 0)
+
+
+def window_rows(closure, window, step):
+    """
+    Finds the raw samples that were aggregated into the cells of a gridded window.
+
+    Args:
+        closure (ClosureWindow): The raw closure, in chronological order.
+        window (ClosureWindow): A window taken from the result of regularize_closure(closure, step).
+        step (float): The grid step used by regularize_closure.
+
+    Returns:
+        tuple: (first, stop) offsets of the raw samples of the window.
+    """
+    # Same cell assignment as regularize_closure, so boundary samples fall on the same side
+    cells = grid_cells(closure.elapsed, closure.elapsed.min(), step)
+    first, stop = np.searchsorted(cells, [window.start, window.stop], side='left')
+    return int(first), int(stop)
+
+
+def valid_window_starts(valid, window_cells, max_gap_cells):
+    """
+    Flags the window positions that contain no gap longer than `max_gap_cells`.
+
+    Windows must also start and end on a filled cell. The test uses cumulative sums, so it costs
+    O(n) for all positions together.
+
+    Args:
+        valid (ndarray): Boolean validity mask of the grid cells.
+        window_cells (int): The window length in cells.
+        max_gap_cells (int): The longest tolerated run of invalid cells.
+
+    Returns:
+        ndarray: Boolean array with one entry per window start.
+    """
+    n_windows = len(valid) - window_cells + 1
+    if n_windows <= 0:
+        return np.zeros(0, dtype=bool)
+
+    # Length of the run of invalid cells each cell belongs to
+    invalid = ~valid
+    run_ids = np.cumsum(valid)
+    run_lengths = np.bincount(run_ids, weights=invalid)[run_ids]
+    long_gap = invalid & (run_lengths > max_gap_cells)
+
+    long_gap_count = np.concatenate(([0], np.cumsum(long_gap)))
+    no_long_gap = long_gap_count[window_cells:] == long_gap_count[:n_windows]
+    return no_long_gap & valid[:n_windows] & valid[window_cells - 1:]
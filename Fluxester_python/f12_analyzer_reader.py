@@ -0,0 +1,448 @@
+import io
+import mmap
+import re
+
+import numpy as np
+import pandas as pd
+
+# Known native export layouts. `signature` identifies the file from its first bytes,
+# `header_prefix` marks the column header line, and rows before `data_prefix` lines are skipped.
+ANALYZER_LAYOUTS = {
+    'LGR': {
+        'signature': b'VC:',
+        'header_prefix': None,  # The column header is the second line
+        'data_prefix': b'',
+        'delimiter': ',',
+        'time_cols': ['Time'],
+        'skip_cols': [],
+        'time_format': '%m/%d/%Y %H:%M:%S.%f',
+        'footer': b'-----BEGIN PGP',  # Signature block appended at the end of the file
+    },
+    'LI-COR': {
+        'signature': b'Model:\tLI-',
+        'header_prefix': b'DATAH\t',
+        'data_prefix': b'DATA\t',
+        'delimiter': '\t',
+        'time_cols': ['DATE', 'TIME'],
+        'skip_cols': ['DATAH', 'REMARK'],  # Row marker and free-text remark
+        'time_format': '%Y-%m-%d %H:%M:%S',
+        'footer': None,
+    },
+    'Picarro': {
+        'signature': b'DATE ',
+        'header_prefix': b'DATE ',
+        'data_prefix': b'',
+        'delimiter': None,  # Columns are padded with spaces
+        'time_cols': ['DATE', 'TIME'],
+        'skip_cols': [],
+        'time_format': '%Y-%m-%d %H:%M:%S.%f',
+        'footer': None,
+    },
+}
+
+
+def detect_analyzer_layout(file_path):
+    """
+    Identifies the analyzer export layout of a file from its first bytes.
+
+    Args:
+        file_path (str): The path of the data file.
+
+    Returns:
+        str: The layout name ('LGR', 'LI-COR' or 'Picarro'), or None for any other file.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            head = file.read(4096)
+    except OSError:
+        return None
+    for name, layout in ANALYZER_LAYOUTS.items():
+        if head.startswith(layout['signature']):
+            # Picarro headers start with DATE like many generic files; require its own column too
+            if name == 'Picarro' and b'FRAC_DAYS_SINCE_JAN1' not in head.split(b'\n', 1)[0]:
+                continue
+            return name
+    return None
+
+
+# Size of the slices of the file scanned for newlines at once, so indexing never needs RAM the size of the file
+_NEWLINE_SCAN_BYTES = 1 << 24
+
+# Width in characters of the date and time directives of the native time formats
+_TIME_DIRECTIVE_WIDTHS = {'%Y': 4, '%m': 2, '%d': 2, '%H': 2, '%M': 2, '%S': 2}
+# Lookup table of the bytes allowed around fixed-width values (the 'S' dtype pads with NUL)
+_IS_PADDING = np.zeros(256, dtype=bool)
+_IS_PADDING[list(b' \t\r\n\0')] = True
+# Valid range of every directive, checked before composing the timestamps
+_TIME_DIRECTIVE_RANGES = {'%Y': (1, 9999), '%m': (1, 12), '%d': (1, 31), '%H': (0, 23), '%M': (0, 59), '%S': (0, 60)}
+
+
+def _parse_fixed_width_times(values, time_format):
+    """
+    Parses byte-string timestamps with digit arithmetic instead of strptime.
+
+    Every value must have the same length, digits at the positions of the directives and the
+    literal characters of the format in between; '%f' may only appear last.
+
+    Args:
+        values (ndarray): Fixed-width byte strings ('S' dtype), possibly padded with whitespace.
+        time_format (str): The strptime format of the values, e.g. '%m/%d/%Y %H:%M:%S.%f'.
+
+    Returns:
+        dict: Directive -> int64 array (nanoseconds for '%f'), or None if the values do not all
+        follow the format, so the caller can fall back to pandas.
+    """
+    if len(values) == 0:
+        return None
+    # Every value must sit at the same position as the first one, surrounded by padding only
+    lead = len(values[0]) - len(values[0].lstrip())
+    length = len(values[0].strip())
+    chars = np.ascontiguousarray(values).view(np.uint8).reshape(len(values), -1)
+    if not (_IS_PADDING[chars[:, :lead]].all() and _IS_PADDING[chars[:, lead + length:]].all()):
+        return None
+    chars = chars[:, lead:lead + length]
+
+    parts, position, index = {}, 0, 0
+    while index < len(time_format):
+        directive = time_format[index:index + 2]
+        if directive == '%f' and index + 2 == len(time_format):
+            width = length - position
+            if not 0 < width <= 9:
+                return None
+        elif directive in _TIME_DIRECTIVE_WIDTHS:
+            width = _TIME_DIRECTIVE_WIDTHS[directive]
+        else:
+            # Literal character of the format
+            if position >= length or (chars[:, position] != ord(time_format[index])).any():
+                return None
+            position += 1
+            index += 1
+            continue
+
+        digits = chars[:, position:position + width].astype(np.int64) - ord('0')
+        if digits.shape[1] != width or ((digits < 0) | (digits > 9)).any():
+            return None
+        parts[directive] = digits @ (10 ** np.arange(width - 1, -1, -1))
+        if directive == '%f':
+            parts[directive] = parts[directive] * 10 ** (9 - width)
+        position += width
+        index += 2
+
+    if position != length:
+        return None
+    for directive, (low, high) in _TIME_DIRECTIVE_RANGES.items():
+        if directive in parts and ((parts[directive] < low) | (parts[directive] > high)).any():
+            return None
+    return parts
+
+
+def _bytes_to_float(values):
+    # Byte-string fields to float; non-numeric fields (e.g. LI-COR remarks) become NaN
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        return pd.to_numeric(np.char.strip(values).astype(str), errors='coerce').astype(np.float64)
+
+
+class AnalyzerFile:
+    """
+    Memory-mapped reader for native LGR, LI-COR and Picarro data files.
+
+    Opening the file only maps it and indexes the byte offset of every data row with a
+    vectorized newline search. Rows are parsed on demand, and only for the requested columns,
+    so a time range can be read from a multi-day file without parsing the rest of it.
+    Space-padded layouts (Picarro) are cut at the column offsets of the header instead of
+    being tokenized.
+    """
+
+    __slots__ = ('layout', 'columns', '_file', '_map', '_row_starts', '_row_ends', '_column_offsets')
+
+    def __init__(self, file_path, layout=None):
+        """
+        Args:
+            file_path (str): The path of the data file.
+            layout (str): The layout name; detected from the file when None.
+
+        Raises:
+            ValueError: If the file does not match a known layout or contains no data rows.
+        """
+        layout = layout or detect_analyzer_layout(file_path)
+        if layout not in ANALYZER_LAYOUTS:
+            raise ValueError(f"Unrecognized analyzer file layout: {file_path}")
+        self.layout = ANALYZER_LAYOUTS[layout]
+
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"The file is empty: {file_path}")
+
+        try:
+            self._index_rows()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._row_starts)
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    @property
+    def value_columns(self):
+        """
+        The numeric columns of the file: every column except the time and skipped ones.
+        """
+        time_cols = self.layout['time_cols']
+        return [col for col in self.columns if col and col not in time_cols and col not in self.layout['skip_cols']]
+
+    def numeric_columns(self, sample_rows=100):
+        """
+        Returns the value columns holding numbers, judged from the first rows of the file.
+
+        Args:
+            sample_rows (int): The number of rows to inspect.
+
+        Returns:
+            list: The numeric columns, in file order; empty fields are ignored.
+        """
+        fields = self._field_bytes(0, min(sample_rows, len(self)), self.value_columns)
+        numeric = []
+        for col in self.value_columns:
+            values = np.char.strip(fields[col])
+            try:
+                values[values != b''].astype(np.float64)
+            except ValueError:
+                continue
+            numeric.append(col)
+        return numeric
+
+    def _index_rows(self):
+        buffer = np.frombuffer(self._map, dtype=np.uint8)
+        try:
+            line_ends = np.concatenate([
+                np.flatnonzero(buffer[offset:offset + _NEWLINE_SCAN_BYTES] == ord('\n')) + offset
+                for offset in range(0, len(buffer), _NEWLINE_SCAN_BYTES)
+            ])
+            if len(line_ends) == 0 or line_ends[-1] != len(buffer) - 1:
+                line_ends = np.append(line_ends, len(buffer))
+            line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+
+            # Locate the column header line
+            prefix = self.layout['header_prefix']
+            if prefix is None:
+                header_line = 1
+            elif self._map[:len(prefix)] == prefix:
+                header_line = 0
+            else:
+                header_offset = self._map.find(b'\n' + prefix)
+                if header_offset == -1:
+                    raise ValueError("The column header line of the analyzer file was not found.")
+                header_line = int(np.searchsorted(line_starts, header_offset + 1))
+            header = self._map[line_starts[header_line]:line_ends[header_line]].decode('latin1').rstrip('\r')
+            self.columns = [name.strip() for name in header.split(self.layout['delimiter'])]
+            # Start of every column name, where the fields of space-padded rows start too
+            self._column_offsets = None if self.layout['delimiter'] else [
+                match.start() for match in re.finditer(r'\S+', header)
+            ]
+
+            # Keep the data lines between the header and the optional footer
+            data_end = len(buffer)
+            if self.layout['footer'] is not None:
+                footer = self._map.find(self.layout['footer'], int(line_starts[header_line]))
+                data_end = footer if footer != -1 else data_end
+            rows = np.arange(header_line + 1, len(line_starts))
+            rows = rows[(line_starts[rows] < data_end) & (line_ends[rows] - line_starts[rows] > 1)]
+
+            prefix = self.layout['data_prefix']
+            if prefix:
+                # Vectorized check of the row prefix, e.g. LI-COR 'DATA\t' (skips the DATAU units line)
+                starts = line_starts[rows]
+                starts = starts[starts + len(prefix) <= len(buffer)]
+                matches = np.ones(len(starts), dtype=bool)
+                for position, byte in enumerate(prefix):
+                    matches &= buffer[starts + position] == byte
+                rows = rows[:len(starts)][matches]
+
+            self._row_starts = line_starts[rows]
+            self._row_ends = line_ends[rows]
+            if len(self._row_starts) == 0:
+                raise ValueError("The selected file contains only headers without data.")
+        finally:
+            # A view left in a traceback frame would keep the map from closing
+            del buffer
+
+    def _row_bytes(self, first, last):
+        # The text of the indexed rows [first, last) only, one row per line; lines that are
+        # not data rows (blank, DATAU, remarks) are cut out when they occur in between
+        starts, ends = self._row_starts[first:last], self._row_ends[first:last]
+        offset = int(starts[0])
+        if np.array_equal(starts[1:], ends[:-1] + 1):
+            return self._map[offset:int(ends[-1])]
+        segment = np.frombuffer(self._map, dtype=np.uint8, count=int(ends[-1]) - offset, offset=offset)
+        marks = np.zeros(len(segment) + 2, dtype=np.int8)
+        marks[starts - offset] += 1
+        marks[ends - offset + 1] -= 1  # Each row keeps its newline
+        return segment[np.cumsum(marks)[:len(segment)] > 0].tobytes()
+
+    def _slice_fields(self, first, last, columns):
+        # Space-padded rows of equal length: cut every field at the column offsets of the header,
+        # provided no field crosses them. Returns None when the rows do not allow it.
+        if self._column_offsets is None:
+            return None
+        starts, ends = self._row_starts[first:last], self._row_ends[first:last]
+        width = int(ends[0] - starts[0])
+        if (ends - starts != width).any() or self._column_offsets[-1] >= width:
+            return None
+        # One row per line of the text; the strides skip the newline that ends every row but the last
+        rows = np.ndarray((len(starts), width), dtype=np.uint8, buffer=self._row_bytes(first, last), strides=(width + 1, 1))
+
+        bounds = self._column_offsets + [width]
+        fields = {}
+        for col in columns:
+            number = self.columns.index(col)
+            field_start, field_end = bounds[number], bounds[number + 1]
+            for bound in (field_start, field_end):
+                if 0 < bound < width and not _IS_PADDING[rows[:, bound - 1]].all():
+                    return None
+            fields[col] = np.ascontiguousarray(rows[:, field_start:field_end]).view(f"S{field_end - field_start}").ravel()
+        return fields
+
+    def _load_fields(self, text, columns, float_cols=()):
+        # Tokenize the rows in a single loadtxt pass that only converts the requested columns:
+        # `float_cols` are parsed straight to float, the others are kept as byte strings
+        dtype = [(f"f{i}", np.float64 if col in float_cols else 'S64') for i, col in enumerate(columns)]
+        records = np.loadtxt(io.BytesIO(text), dtype=dtype, delimiter=self.layout['delimiter'],
+                             usecols=[self.columns.index(col) for col in columns], ndmin=1, comments=None,
+                             encoding='latin1')
+        return {col: records[f"f{i}"] for i, col in enumerate(columns)}
+
+    def _field_bytes(self, first, last, columns):
+        # The fields of rows [first, last) as byte strings, one array per column
+        fields = self._slice_fields(first, last, columns)
+        return fields if fields is not None else self._load_fields(self._row_bytes(first, last), columns)
+
+    def _parse_rows(self, first, last, time_cols, value_cols):
+        # Time fields are kept as byte strings, values are parsed to float
+        columns = time_cols + value_cols
+        fields = self._slice_fields(first, last, columns)
+        if fields is None:
+            text = self._row_bytes(first, last)
+            try:
+                return self._load_fields(text, columns, value_cols)
+            except ValueError:
+                fields = self._load_fields(text, columns)
+        for col in value_cols:
+            fields[col] = _bytes_to_float(fields[col])
+        return fields
+
+    def _parse_times(self, fields):
+        time_cols = self.layout['time_cols']
+        formats = self.layout['time_format'].split(' ', len(time_cols) - 1)
+        parts = {}
+        for col, time_format in zip(time_cols, formats):
+            col_parts = _parse_fixed_width_times(fields[col], time_format)
+            if col_parts is None:
+                break
+            parts.update(col_parts)
+        else:
+            months = (parts.get('%Y', 1970) - 1970) * 12 + parts.get('%m', 1) - 1
+            days = months.astype('datetime64[M]').astype('datetime64[D]') + (parts.get('%d', 1) - 1)
+            seconds = (parts.get('%H', 0) * 60 + parts.get('%M', 0)) * 60 + parts.get('%S', 0)
+            return days.astype('datetime64[ns]') + (seconds * 10 ** 9 + parts.get('%f', 0)).astype('timedelta64[ns]')
+
+        # Irregular values: let pandas parse them, or report what does not match the format
+        text = np.char.strip(fields[time_cols[0]]).astype(str)
+        for col in time_cols[1:]:
+            text = np.char.add(np.char.add(text, ' '), np.char.strip(fields[col]).astype(str))
+        times = pd.to_datetime(text, format=self.layout['time_format'])
+        return times.to_numpy(dtype='datetime64[ns]')
+
+    def _row_time(self, row):
+        return self._parse_times(self._parse_rows(row, row + 1, self.layout['time_cols'], []))[0]
+
+    def find_rows(self, start_time=None, end_time=None):
+        """
+        Finds the rows inside a time range with a binary search over the row offsets.
+
+        Only about log2(n) rows are parsed; the file is assumed to be in chronological order.
+
+        Args:
+            start_time: First timestamp to include (anything accepted by pandas.Timestamp), or None.
+            end_time: Last timestamp to include, or None.
+
+        Returns:
+            tuple: (first row, one past the last row).
+        """
+        def bisect(timestamp, right):
+            low, high = 0, len(self)
+            while low < high:
+                middle = (low + high) // 2
+                row_time = self._row_time(middle)
+                if row_time < timestamp or (right and row_time == timestamp):
+                    low = middle + 1
+                else:
+                    high = middle
+            return low
+
+        first = 0 if start_time is None else bisect(pd.Timestamp(start_time).to_datetime64(), right=False)
+        last = len(self) if end_time is None else bisect(pd.Timestamp(end_time).to_datetime64(), right=True)
+        return first, max(first, last)
+
+    def read(self, columns=None, start_time=None, end_time=None):
+        """
+        Parses the requested columns of the rows inside a time range.
+
+        Args:
+            columns (list): Numeric columns to read; all non-time columns when None.
+            start_time: First timestamp to include, or None for the start of the file.
+            end_time: Last timestamp to include, or None for the end of the file.
+
+        Returns:
+            tuple: (datetime64 array of the timestamps, dict of column name -> float array).
+        """
+        time_cols = self.layout['time_cols']
+        columns = self.value_columns if columns is None else [col for col in dict.fromkeys(columns) if col not in time_cols]
+        first, last = self.find_rows(start_time, end_time)
+        if first == last:
+            return np.array([], dtype='datetime64[ns]'), {col: np.array([], dtype=np.float64) for col in columns}
+
+        fields = self._parse_rows(first, last, time_cols, columns)
+        return self._parse_times(fields), {col: fields[col] for col in columns}
+
+
+def read_analyzer_file(file_path, columns=None, start_time=None, end_time=None):
+    """
+    Reads a native analyzer file into a DataFrame for the plotting step.
+
+    The timestamps are returned already parsed in a 'datetime' column, so process_columns does
+    not need to join and parse date and time text again.
+
+    Args:
+        file_path (str): The path of the data file.
+        columns (list): Numeric columns to read; all of them when None.
+        start_time: First timestamp to include, or None.
+        end_time: Last timestamp to include, or None.
+
+    Returns:
+        DataFrame: The 'datetime' column followed by the numeric columns.
+    """
+    with AnalyzerFile(file_path) as analyzer_file:
+        times, values = analyzer_file.read(columns, start_time, end_time)
+
+    data = pd.DataFrame({'datetime': times})
+    for col, column_values in values.items():
+        data[col] = column_values
+    return data
@@ -0,0 +1,146 @@
+import warnings
+
+import numpy as np
+
+# Longest dead band the detector may return, like the manual entry limit
+DEFAULT_MAX_DEAD_BAND_SECONDS = 60
+# Shortest trend that must remain after the dead band to judge the fit
+MIN_FIT_SECONDS = 10
+# Length of trajectory examined after the longest possible dead band
+EARLY_TAIL_SECONDS = 30
+
+
+def parse_dead_band(value):
+    """
+    Converts the dead band entry of the column selection UI.
+
+    Args:
+        value (str or int): A number of seconds, or 'auto' for per-closure detection.
+
+    Returns:
+        int or str: The manual dead band in seconds, or 'auto'.
+    """
+    if isinstance(value, str) and value.strip().lower() == 'auto':
+        return 'auto'
+    return int(value)
+
+
+def _suffix_sum(values):
+    # Sum of values[:, k:] for every k
+    return np.cumsum(values[:, ::-1], axis=1)[:, ::-1]
+
+
+def detect_dead_bands(closures, gas_cols, max_dead_band=DEFAULT_MAX_DEAD_BAND_SECONDS, min_fit=MIN_FIT_SECONDS):
+    """
+    Estimates where the chamber mixing (dead band) ends for many closures and gases at once.
+
+    The early part of every closure is stacked into one NaN-padded matrix. For each candidate
+    end k, the samples from k on are fitted with a straight line, and every sample dropped before
+    k costs log(n) times the noise variance, estimated from successive differences. All
+    candidates of all closures are scored together with cumulative sums, and the cheapest end
+    is returned. Samples are only dropped when they depart from the later trend by more than
+    the noise, so a clean linear closure keeps a dead band of zero.
+
+    Args:
+        closures (list): ClosureWindow objects on a regular time grid.
+        gas_cols (list): The concentration columns to examine.
+        max_dead_band (float): The longest dead band to consider, in seconds.
+        min_fit (float): The shortest trajectory that must remain after the dead band, in seconds.
+
+    Returns:
+        ndarray: Dead band in seconds, shape (number of closures, number of gases).
+        NaN where a gas is missing from a closure or the closure is too short.
+    """
+    dead_bands = np.full((len(closures), len(gas_cols)), np.nan)
+    if not closures:
+        return dead_bands
+
+    # Stack the early trajectories; closures may differ in length and grid step
+    early = max_dead_band + EARLY_TAIL_SECONDS
+    lengths = [int(np.searchsorted(closure.elapsed, closure.elapsed[0] + early, side='right')) for closure in closures]
+    width = max(lengths)
+    x = np.full((len(closures), width), np.nan)
+    for row, (closure, length) in enumerate(zip(closures, lengths)):
+        x[row, :length] = closure.elapsed[:length] - closure.elapsed[0]
+
+    for column, gas_col in enumerate(gas_cols):
+        y = np.full((len(closures), width), np.nan)
+        for row, (closure, length) in enumerate(zip(closures, lengths)):
+            if gas_col in closure.gases:
+                valid = slice(None) if closure.valid is None else closure.valid[:length]
+                y[row, :length] = np.where(valid, closure.gases[gas_col][:length], np.nan)
+
+        weights = np.isfinite(x) & np.isfinite(y)
+        n_total = weights.sum(axis=1)
+        usable = n_total >= 3
+        if not usable.any():
+            continue
+
+        # Center both variables per closure to keep the sums well conditioned
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_centered = np.where(weights, x - np.nansum(np.where(weights, x, 0), axis=1, keepdims=True) / n_total[:, None], 0.0)
+            y_centered = np.where(weights, y - np.nansum(np.where(weights, y, 0), axis=1, keepdims=True) / n_total[:, None], 0.0)
+
+        # Linear fit of the samples from k on, for every k, via suffix sums
+        n = _suffix_sum(weights.astype(np.float64))
+        sx, sy = _suffix_sum(x_centered), _suffix_sum(y_centered)
+        sxx, syy, sxy = _suffix_sum(x_centered ** 2), _suffix_sum(y_centered ** 2), _suffix_sum(x_centered * y_centered)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_spread = sxx - sx ** 2 / n
+            residual = syy - sy ** 2 / n - (sxy - sx * sy / n) ** 2 / x_spread
+
+        # Noise variance from successive differences, insensitive to the trend
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Closures without this gas are all NaN
+            noise = (np.nanmedian(np.abs(np.diff(y, axis=1)), axis=1) / 0.6745) ** 2 / 2
+
+        dropped = n_total[:, None] - n
+        cost = residual + np.log(np.maximum(n_total, 2))[:, None] * noise[:, None] * dropped
+
+        # Only ends on a valid sample, within the limit, leaving enough trend to fit
+        last_time = np.nanmax(np.where(weights, x, np.nan), axis=1, initial=-np.inf)
+        allowed = (weights & (x <= max_dead_band) & (last_time[:, None] - x >= min_fit)
+                   & (n >= 3) & (x_spread > 0) & np.isfinite(cost))
+        cost = np.where(allowed, cost, np.inf)
+
+        best = np.argmin(cost, axis=1)
+        found = usable & allowed.any(axis=1)
+        dead_bands[found, column] = x[found, best[found]]
+
+    return dead_bands
+
+
+def detect_closure_dead_bands(closures, gas_cols, max_dead_band=DEFAULT_MAX_DEAD_BAND_SECONDS):
+    """
+    Detects the dead bands of many closures in one batched computation, per closure and gas.
+
+    Args:
+        closures (list): ClosureWindow objects on a regular time grid.
+        gas_cols (list): The concentration columns to examine; names missing from every closure are skipped.
+        max_dead_band (float): The longest dead band to consider, in seconds.
+
+    Returns:
+        list: One dict per closure, gas column -> dead band in seconds.
+    """
+    present = [gas_col for gas_col in dict.fromkeys(gas_cols) if any(gas_col in closure.gases for closure in closures)]
+    dead_bands = detect_dead_bands(closures, present, max_dead_band)
+    return [{gas_col: dead_bands[row, column] for column, gas_col in enumerate(present) if gas_col in closure.gases}
+            for row, closure in enumerate(closures)]
+
+
+def closure_dead_band(dead_bands_by_gas):
+    """
+    Combines the dead bands of the gases of a closure into the one applied before the window search.
+
+    The longest dead band is used, so every gas has finished mixing.
+
+    Args:
+        dead_bands_by_gas (dict): Gas column -> detected dead band in seconds (NaN if unknown).
+
+    Returns:
+        float: The dead band in seconds, 0 when nothing was detected.
+    """
+    values = np.array(list(dead_bands_by_gas.values()), dtype=np.float64)
+    if not np.isfinite(values).any():
+        return 0.0
+    return float(np.nanmax(values))
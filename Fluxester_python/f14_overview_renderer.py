@@ -0,0 +1,106 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+
+# Number of points merged into one bin from one pyramid level to the next
+PYRAMID_FACTOR = 4
+# Raw points are drawn when no more than this many are visible
+DEFAULT_MAX_RAW_POINTS = 20000
+
+
+class OverviewRenderer:
+    """
+    Draws a concentration time series on an Axes so it stays fast with millions of points.
+
+    When few points are visible they are drawn as plain markers. Otherwise the view is drawn as a
+    min/max envelope: one vertical segment per bin, taken from a multi-resolution pyramid built
+    once at start-up, at the level giving about one bin per pixel column. The artists are updated
+    in place whenever the x-limits change, so panning and zooming never redraw every row.
+    """
+
+    def __init__(self, ax, datetimes, values, max_raw_points=DEFAULT_MAX_RAW_POINTS):
+        """
+        Args:
+            ax (Axes): The axes to draw on.
+            datetimes (array-like): The timestamps of the points.
+            values (array-like): The y values of the points.
+            max_raw_points (int): The largest number of visible points drawn individually.
+        """
+        self.ax = ax
+        self.max_raw_points = max_raw_points
+        ax.xaxis_date()
+
+        x = mdates.date2num(np.asarray(datetimes, dtype='datetime64[ns]'))
+        y = np.asarray(values, dtype=np.float64)
+        self._order = np.argsort(x, kind='stable')
+        self.x, self.y = x[self._order], y[self._order]
+        self._selected = np.zeros(len(self.x), dtype=bool)
+        self._levels = self._build_pyramid()
+
+        # Artists reused for every view: raw markers, envelope segments and the selection overlay
+        self._points, = ax.plot([], [], linestyle='none', marker='o', markersize=5.5, color='black',
+                                markeredgecolor='white', markeredgewidth=0.5)
+        self._envelope = LineCollection([], colors='black', linewidths=1.0, capstyle='projecting')
+        ax.add_collection(self._envelope)
+        self._selection, = ax.plot([], [], linestyle='none', marker='o', markersize=5.5, color='#006400',
+                                   markeredgecolor='white', markeredgewidth=0.5)
+
+        finite = np.isfinite(self.y)
+        if finite.any():
+            y_min, y_max = self.y[finite].min(), self.y[finite].max()
+            margin = (y_max - y_min) * 0.05 or 1.0
+            ax.set_ylim(y_min - margin, y_max + margin)
+        ax.callbacks.connect('xlim_changed', lambda changed_ax: self.update())
+
+    def _build_pyramid(self):
+        # Level i merges PYRAMID_FACTOR ** (i + 1) raw points per bin; NaN values are ignored
+        levels = []
+        x_first, x_last, y_min, y_max = self.x, self.x, self.y, self.y
+        while len(x_first) > 1:
+            starts = np.arange(0, len(x_first), PYRAMID_FACTOR)
+            ends = np.minimum(starts + PYRAMID_FACTOR, len(x_first)) - 1
+            x_first, x_last = x_first[starts], x_last[ends]
+            y_min, y_max = np.fmin.reduceat(y_min, starts), np.fmax.reduceat(y_max, starts)
+            levels.append((x_first, x_last, y_min, y_max))
+        return levels
+
+    def set_selected(self, mask):
+        """
+        Highlights the selected points.
+
+        Args:
+            mask (ndarray): Boolean mask over the points, in the order they were given.
+        """
+        self._selected = np.asarray(mask, dtype=bool)[self._order]
+        self.update()
+
+    def update(self):
+        """
+        Re-aggregates the points of the current view and updates the artists in place.
+        """
+        x_low, x_high = self.ax.get_xlim()
+        first, last = np.searchsorted(self.x, [x_low, x_high], side='left')
+        last = min(last + 1, len(self.x))
+        first = max(first - 1, 0)
+
+        visible = last - first
+        if visible <= self.max_raw_points:
+            self._points.set_data(self.x[first:last], self.y[first:last])
+            self._envelope.set_segments([])
+        else:
+            # Coarsest level that still gives about one bin per pixel column
+            pixels = max(int(self.ax.get_window_extent().width), 1)
+            level = 0
+            while level + 1 < len(self._levels) and visible / PYRAMID_FACTOR ** (level + 2) >= pixels:
+                level += 1
+            x_first, x_last, y_min, y_max = self._levels[level]
+            size = PYRAMID_FACTOR ** (level + 1)
+            bins = slice(first // size, -(-last // size))
+            x_mid = (x_first[bins] + x_last[bins]) / 2
+            segments = np.stack([np.column_stack([x_mid, y_min[bins]]), np.column_stack([x_mid, y_max[bins]])], axis=1)
+            self._envelope.set_segments(segments[np.isfinite(segments).all(axis=(1, 2))])
+            self._points.set_data([], [])
+
+        selected = np.flatnonzero(self._selected[first:last]) + first
+        self._selection.set_data(self.x[selected], self.y[selected])
+        self.ax.figure.canvas.draw_idle()
@@ -47,9 +47,11 @@ def create_column_selection_ui(df, callback):
                 CustomMessageBox(title="Error", message=f"Column '{col}' does not exist in the dataset.")
                 return
 
-        dead_band = selections[-1]
-        if not dead_band.isdigit() or not (0 <= int(dead_band) <= 60):
-            CustomMessageBox(title="Error", message="Dead band must be an integer between 0 and 60.")
+        dead_band = selections[-1].strip()
+        if dead_band.lower() == 'auto':
+            selections[-1] = 'auto'
+        elif not dead_band.isdigit() or not (0 <= int(dead_band) <= 60):
+            CustomMessageBox(title="Error", message="Dead band must be an integer between 0 and 60, or 'auto'.")
             return
 
         save_column_selections(*selections)
@@ -64,7 +66,7 @@ def create_column_selection_ui(df, callback):
     root.geometry('400x450')
 
     prev_selections = load_previous_selections()
-    labels = ["Date column (YYYY-MM-DD)", "Time column (24HR:MM:SS)", "Y-variable column", "CO2 column", "CH4 column", "H2O-vapor column", "N2O column", "Dead Band (0-60)"]
+    labels = ["Date column (YYYY-MM-DD)", "Time column (24HR:MM:SS)", "Y-variable column", "CO2 column", "CH4 column", "H2O-vapor column", "N2O column", "Dead Band (0-60 s or auto)"]
     vars = [ctk.StringVar(value=val or 'None') for val in prev_selections]
 
     for label, var in zip(labels, vars):
@@ -73,7 +75,7 @@ def create_column_selection_ui(df, callback):
 
         ctk.CTkLabel(frame, text=label, width=200, anchor='w').pack(side='left', padx=5)
         
-        if label == "Dead Band (0-60)":
+        if label == "Dead Band (0-60 s or auto)":
             ctk.CTkEntry(frame, textvariable=var, width=150).pack(side='right', padx=5)
         else:
             ctk.CTkOptionMenu(frame, variable=var, values=['None'] + list(df.columns)).pack(side='right', padx=5, expand=True)
@@ -12,16 +12,35 @@ import pandas as pd
 import numpy as np
 from tkinter import messagebox
 import pytz
-from f4_moving_window_selector import find_best_moving_window, get_user_window_size
-from f5_slope_calculator import estimate_gas_slope
-from f6_window_stats_calculator import calculate_window_statistics
-from f7_best_fit_model_plotter import plot_gas_with_best_window
+import queue
+from f4_moving_window_selector import get_user_window_size
+from f8_closure_worker import ClosureWorker
+from f14_overview_renderer import OverviewRenderer
+from f13_dead_band_detector import parse_dead_band
+from f10_project_manifest import (get_manifest_path, new_manifest, load_manifest, save_manifest,
+                                  select_closure_rows, closure_fingerprint, plan_recompute)
 
 
 # Initialize a set to store indices of selected data points and a variable for the Axes object
 selected_indices = set()
 ax = None
 
+# Renderer drawing the y-axis column as raw points or as a min/max overview, depending on the zoom
+overview = None
+
+# Background worker that runs the window search, fitting and export of the saved closures
+closure_worker = ClosureWorker()
+status_text = None
+
+# Project manifest of the open file, the rectangles of the current selection,
+# the manifest position of the closure each worker job belongs to,
+# and the manifest positions of the closures of each batch job
+manifest = None
+manifest_file = None
+selected_rectangles = []
+job_closures = {}
+batch_closures = {}
+
 def apply_date_formatting():
     """
     Apply date formatting to the x-axis of the plot.
@@ -38,7 +57,7 @@ global df, rect_selector
 # Other global variables to store the names of gas columns and dead band value
 global co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, dead_band_value
 
-def process_columns(df_param, date_col, time_col, y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, dead_band):
+def process_columns(df_param, date_col, time_col, y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, dead_band, input_path=None):
     """
     Process the DataFrame columns and set up the initial plot.
 
@@ -51,24 +70,25 @@ def process_columns(df_param, date_col, time_col, y_axis_col, co2_col, ch4_col,
     ch4_col (str): The name of the CH4 column.
     h2o_col (str): The name of the H2O column.
     n2o_col (str): The name of the N2O column.
-    dead_band (int): The dead band value for slope calculation.
+    dead_band (int or str): The dead band value for slope calculation, in seconds, or 'auto' to detect it per closure.
+    input_path (str): The path of the data file; when given, closures are recorded in its project manifest.
     """
-    global ax, selected_indices, y_axis_col_name, df, rect_selector
+    global ax, selected_indices, y_axis_col_name, df, rect_selector, status_text, overview
     global co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, dead_band_value
 
     # Update the global variables with the parameters passed to the function
-    y_axis_col_name, co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, dead_band_value = y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, dead_band
+    y_axis_col_name, co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, dead_band_value = y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, parse_dead_band(dead_band)
     df = df_param
 
-    # Convert date and time columns to a datetime format and create a figure and axes
-    df['datetime'] = pd.to_datetime(df[date_col] + ' ' + df[time_col])
+    # Convert date and time columns to a datetime format, unless the reader already parsed them, and create a figure and axes
+    if 'datetime' not in df.columns or not pd.api.types.is_datetime64_any_dtype(df['datetime']):
+        df['datetime'] = pd.to_datetime(df[date_col] + ' ' + df[time_col])
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    # Scatter plot with custom style
-    ax.scatter(df['datetime'], df[y_axis_col], 
-               color='black', edgecolor='white', s=30, linewidth=0.5)
+    # Points with custom style, aggregated into an overview when too many are visible
+    overview = OverviewRenderer(ax, df['datetime'], df[y_axis_col])
 
-    # Apply date formatting to the x-axis initially
+    # Apply date formatting to the x-axis; ticks created on later redraws copy this style
     apply_date_formatting()  
 
     # Increase bottom padding for better label display
@@ -87,11 +107,24 @@ def process_columns(df_param, date_col, time_col, y_axis_col, co2_col, ch4_col,
     button = Button(button_ax, 'Save Selection', color='lightblue', hovercolor='blue')
     button.on_clicked(submit_selection)
 
-    # Attach the event handler
-    button.on_clicked(submit_selection)
+    # Setup a button for cancelling the closures being processed
+    cancel_ax = fig.add_axes([0.755, 0.01, 0.11, 0.05])
+    cancel_button = Button(cancel_ax, 'Cancel', color='lightgrey', hovercolor='salmon')
+    cancel_button.on_clicked(cancel_processing)
+
+    # Status line showing the progress of the background worker
+    status_text = fig.text(0.01, 0.025, "Select a closure and click 'Save Selection'", fontsize=9)
+
+    # Poll the worker results from the GUI event loop
+    poll_timer = fig.canvas.new_timer(interval=100)
+    poll_timer.add_callback(poll_worker_results)
+    poll_timer.start()
 
-    # Connect the on_draw event to reapply date formatting when the plot is redrawn
-    fig.canvas.mpl_connect('draw_event', lambda event: apply_date_formatting())
+    # Reload the closures of a previous session and recompute the ones that changed
+    if input_path:
+        columns = {'date': date_col, 'time': time_col, 'y_axis': y_axis_col,
+                   'co2': co2_col, 'ch4': ch4_col, 'h2o': h2o_col, 'n2o': n2o_col}
+        open_project(input_path, columns, dead_band_value)
 
     plt.show()  # Display the plot
 
@@ -107,6 +140,7 @@ def onselect(eclick, erelease):
     # Clear previous selection if this is a new selection (not a double-click)
     if not eclick.dblclick:
         selected_indices.clear()
+        selected_rectangles.clear()
 
     # Convert mouse click and release positions to datetime values
     x1, x2 = num2date(eclick.xdata), num2date(erelease.xdata)
@@ -115,9 +149,10 @@ def onselect(eclick, erelease):
     x2 = x2.replace(tzinfo=None)
 
     # Identify and update the indices of the selected data points
-    selected = df[(df['datetime'] >= min(x1, x2)) & (df['datetime'] <= max(x1, x2)) &
-                  (df[y_axis_col_name] >= eclick.ydata) & (df[y_axis_col_name] <= erelease.ydata)]
-    selected_indices.update(selected.index)
+    rectangle = [min(x1, x2).isoformat(), max(x1, x2).isoformat(),
+                 min(eclick.ydata, erelease.ydata), max(eclick.ydata, erelease.ydata)]
+    selected_rectangles.append(rectangle)
+    selected_indices.update(select_closure_rows(df, [rectangle], y_axis_col_name))
     update_plot()  # Update the plot with the new selection
 
 
@@ -128,37 +163,23 @@ def update_plot():
     """
     global ax, selected_indices
 
-    # Save the current zoom level and plot position
-    x_lim = ax.get_xlim()
-    y_lim = ax.get_ylim()
-
-    # Clear the axes and redraw the scatter plot with the updated selection
-    ax.clear()
-    xdata, ydata = df['datetime'], df[y_axis_col_name]
-    colors = ['#006400' if i in selected_indices else 'black' for i in range(len(xdata))]
-    ax.scatter(xdata, ydata, color=colors, edgecolor='white', s=30, linewidth=0.5)
-
-    apply_date_formatting()  # Reapply date formatting
-
-    # Restore the zoom level and plot position
-    ax.set_xlim(x_lim)
-    ax.set_ylim(y_lim)
-
-    plt.subplots_adjust(bottom=0.15)
-    plt.draw()  # Redraw the updated plot
+    # Only the selection overlay changes; the zoom level, plot position and formatting are kept
+    overview.set_selected(df.index.isin(list(selected_indices)))
 
 
 
 def process_and_visualize_data():
     """
-    Process selected data and apply slope calculation, window statistics, and visualization.
+    Snapshot the selected closure and queue it for slope calculation, window statistics, and visualization.
+    The heavy work runs on the background worker, so the plot stays responsive and the next
+    closure can be selected while this one is being computed.
     """
     global selected_indices, df, co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, dead_band_value, y_axis_col_name
 
-    DEFAULT_MOVING_WINDOW_SIZE = 35  # Default moving window size
+    DEFAULT_MOVING_WINDOW_SIZE = 35  # Default moving window size, in seconds
     response = messagebox.askquestion(
         'Set Moving Window Size',
-        f'The default moving window size is {DEFAULT_MOVING_WINDOW_SIZE}. Do you want to proceed with this size?'
+        f'The default moving window size is {DEFAULT_MOVING_WINDOW_SIZE} seconds. Do you want to proceed with this size?'
     )
     if response != 'yes':
         new_window_size = get_user_window_size(DEFAULT_MOVING_WINDOW_SIZE)
@@ -169,92 +190,192 @@ def process_and_visualize_data():
             DEFAULT_MOVING_WINDOW_SIZE = new_window_size  # Update the window size
 
     if selected_indices:
-        selected_indices_list = list(selected_indices)
-        selected_data = df.loc[selected_indices_list]
-
-        # Adjust for dead band
-        dead_band = int(dead_band_value)
-        if len(selected_data) > dead_band + DEFAULT_MOVING_WINDOW_SIZE:
-            data_after_dead_band = selected_data.iloc[dead_band:]
-            best_window_data = find_best_moving_window(
-                data_after_dead_band, DEFAULT_MOVING_WINDOW_SIZE, 'datetime', y_axis_col_name
-            )
-
-            # Define the time range for the best window
-            start_datetime = best_window_data['datetime'].iloc[0]
-            end_datetime = best_window_data['datetime'].iloc[-1]
-
-            # Generate datetime strings for filenames
-            start_datetime_str = start_datetime.strftime('%Y%m%d%H%M%S')
-            end_datetime_str = end_datetime.strftime('%Y%m%d%H%M%S')
-
-            summary = {}
-            fig, axs = plt.subplots(len([co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name]), figsize=(10, 12))
-
-            # Loop through each gas column
-            for i, gas_col in enumerate([co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name]):
-                if gas_col and gas_col in best_window_data.columns:
-                    gas_concentration = best_window_data[gas_col].to_numpy()
-                    slope, intercept, p_value, method, popt = estimate_gas_slope(
-                        gas_concentration, best_window_data['datetime'], gas_col
-                    )
-
-                    # Update the summary dictionary
-                    summary[f"{gas_col}_slope"] = slope
-                    summary[f"{gas_col}_p_value"] = p_value
-                    summary[f"{gas_col}_method"] = method
-
-                    # Plot the data
-                    plot_gas_with_best_window(selected_data, best_window_data, gas_col, slope, intercept, method, popt, axs[i])
-                    axs[i].set_ylabel(f"{gas_col} Concentration")
-                    axs[i].title.set_text(None)
-
-                    # Show x-axis tick labels only on the last graph
-                    if i != len([co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name]) - 1:
-                        axs[i].set_xticklabels([])
-
-            # Adjust layout and save the figure
-            plt.tight_layout(pad=3.0)
-            output_folder = "./data"
-            os.makedirs(output_folder, exist_ok=True)
-            fig.savefig(f"{output_folder}/{start_datetime_str}_to_{end_datetime_str}_gases.png")
-
-            # Handle additional columns
-            for col in best_window_data.columns:
-                if col not in [co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name, 'datetime']:
-                    if pd.api.types.is_numeric_dtype(best_window_data[col]):
-                        summary[col] = best_window_data[col].mean(skipna=True)
-                    elif pd.api.types.is_categorical_dtype(best_window_data[col]) or pd.api.types.is_object_dtype(best_window_data[col]):
-                        summary[col] = best_window_data[col].iloc[0]
-
-            # Save the summary
-            summary_df = pd.DataFrame([summary])
-            summary_csv_path = f"{output_folder}/{start_datetime_str}_to_{end_datetime_str}_summary.csv"
-            summary_df.to_csv(summary_csv_path, index=False)
-            messagebox.showinfo("Info", f"Slope, summary stats, and figures saved in {output_folder}")
+        # Copy the selected rows so later selections cannot change the data the worker is using
+        selected_data = df.loc[sorted(selected_indices)].copy()
+
+        # Adjust for dead band (seconds); a detected dead band is only known once the closure is processed
+        dead_band = dead_band_value
+        minimum_dead_band = 0 if dead_band == 'auto' else dead_band
+        if closure_duration(selected_data) >= minimum_dead_band + DEFAULT_MOVING_WINDOW_SIZE:
+            position = None
+            if manifest is not None:
+                # Record the closure before it is computed, so it survives closing the window
+                manifest['closures'].append({
+                    'selections': list(selected_rectangles),
+                    'window_size': DEFAULT_MOVING_WINDOW_SIZE,
+                    'fingerprint': closure_fingerprint(selected_data, manifest['columns'], dead_band, DEFAULT_MOVING_WINDOW_SIZE),
+                    'results': None,
+                    'error': None,
+                })
+                save_manifest(manifest, manifest_file)
+                position = len(manifest['closures']) - 1
+            queue_closure(selected_data, DEFAULT_MOVING_WINDOW_SIZE, position)
+            update_status(f"Closure queued ({closure_worker.pending()} in progress)")
         else:
             messagebox.showwarning("Warning", "Insufficient data points after applying dead band for the moving window.")
     else:
         messagebox.showwarning("Warning", "No data points selected.")
 
-        
+
+def closure_duration(selected_data):
+    """
+    Return the time covered by the selected rows, in seconds.
+    """
+    if selected_data.empty:
+        return 0.0
+    return (selected_data['datetime'].max() - selected_data['datetime'].min()).total_seconds()
+
+
+def queue_closure(selected_data, window_size, position=None):
+    """
+    Submit a closure to the background worker.
+
+    Args:
+    selected_data (DataFrame): A private copy of the closure rows.
+    window_size (int): The moving window size.
+    position (int): The position of the closure in the project manifest, if any.
+    """
+    job_id = closure_worker.submit(
+        selected_data,
+        gas_cols=[co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name],
+        y_axis_col=y_axis_col_name,
+        dead_band=dead_band_value,
+        window_size=window_size,
+        output_folder="./data",
+    )
+    if position is not None:
+        job_closures[job_id] = position
+
+
+def open_project(input_path, columns, dead_band):
+    """
+    Load the project manifest of the input file, or start a new one.
+    Closures whose data or parameters are unchanged keep their saved results or error; the others are queued again.
+
+    Args:
+    input_path (str): The path of the data file.
+    columns (dict): The selected column for each role ('date', 'time', 'y_axis', 'co2', ...).
+    dead_band (int or str): The dead band value in seconds, or 'auto'.
+    """
+    global manifest, manifest_file
+
+    manifest_file = get_manifest_path(input_path)
+    manifest = load_manifest(manifest_file)
+    if manifest is None:
+        manifest = new_manifest(input_path, columns, dead_band)
+        save_manifest(manifest, manifest_file)
+        return
+
+    stale = plan_recompute(manifest, df, input_path, columns, dead_band)
+    minimum_dead_band = 0 if dead_band == 'auto' else dead_band
+    recompute = []
+    for position, selected_data, fingerprint in stale:
+        closure = manifest['closures'][position]
+        closure['fingerprint'] = fingerprint
+        closure['results'] = None
+        closure['error'] = None
+        if closure_duration(selected_data) >= minimum_dead_band + closure['window_size']:
+            recompute.append((position, selected_data))
+        else:
+            closure['error'] = "Insufficient data points after applying dead band for the moving window."
+    save_manifest(manifest, manifest_file)
+
+    # One worker job detects the dead bands of all recomputed closures together, then queues them
+    if recompute:
+        batch_id = closure_worker.submit_batch(
+            [selected_data for _, selected_data in recompute],
+            [manifest['closures'][position]['window_size'] for position, _ in recompute],
+            gas_cols=[co2_col_name, ch4_col_name, h2o_col_name, n2o_col_name],
+            y_axis_col=y_axis_col_name,
+            dead_band=dead_band,
+            output_folder="./data",
+        )
+        batch_closures[batch_id] = [position for position, _ in recompute]
+
+    loaded = len(manifest['closures']) - len(recompute)
+    failed = sum(closure.get('error') is not None for closure in manifest['closures'])
+    update_status(f"Loaded {loaded} closures from the project manifest ({failed} failed), recomputing {len(recompute)}")
+
+
+def update_status(message):
+    """
+    Show a progress or result message in the status line below the plot.
+    """
+    status_text.set_text(message)
+    ax.figure.canvas.draw_idle()
+
+
+def poll_worker_results():
+    """
+    Collect progress and results posted by the background worker.
+    This runs on the GUI event loop through a canvas timer, so it is safe to update the plot here.
+    """
+    message = None
+    while True:
+        try:
+            kind, job_id, payload = closure_worker.results.get_nowait()
+        except queue.Empty:
+            break
+
+        if kind == 'cancelled':
+            job_closures.pop(job_id, None)
+
+        pending = closure_worker.pending()
+        queued = f" ({pending - 1} more queued)" if pending > 1 else ""
+        if job_id in batch_closures and kind != 'progress':
+            # The batch has queued one job per closure; their results are saved as they arrive
+            positions = batch_closures.pop(job_id)
+            if kind == 'done':
+                job_closures.update(zip(payload, positions))
+                message = f"Queued {len(payload)} closures to recompute{queued}"
+            elif kind == 'cancelled':
+                message = f"Recomputing cancelled{queued}"
+            else:
+                message = "Recomputing failed"
+                messagebox.showerror("Error", f"Failed to prepare the closures to recompute: {payload}")
+        elif kind == 'progress':
+            step, total, text = payload
+            message = f"Closure {job_id}: {text} [{step}/{total}]{queued}"
+        elif kind == 'done':
+            position = job_closures.pop(job_id, None)
+            if position is not None:
+                manifest['closures'][position]['results'] = payload
+                manifest['closures'][position]['error'] = None
+                save_manifest(manifest, manifest_file)
+            message = f"Closure {job_id}: slope, summary stats, and figures saved in {os.path.dirname(payload['summary_path'])}{queued}"
+        elif kind == 'cancelled':
+            message = f"Closure {job_id}: cancelled{queued}"
+        elif kind == 'error':
+            # Recorded with its fingerprint, so reopening the project does not retry unchanged closures
+            position = job_closures.pop(job_id, None)
+            if position is not None:
+                manifest['closures'][position]['error'] = payload
+                save_manifest(manifest, manifest_file)
+            message = f"Closure {job_id}: failed{queued}"
+            messagebox.showerror("Error", f"Failed to process closure {job_id}: {payload}")
+
+    if message is not None:
+        update_status(message)
+
+
+def cancel_processing(event):
+    """
+    Handle the event when the 'Cancel' button is clicked.
+    This cancels the closure being processed and every closure still waiting in the queue.
+    """
+    if closure_worker.pending():
+        closure_worker.cancel()
+        update_status("Cancelling...")
+
+
 def submit_selection(event):
     """
     Handle the event when the 'Save Selection' button is clicked.
-    This function saves the selected data and resets the RectangleSelector.
+    This queues the selected data and resets the RectangleSelector.
     """
     global rect_selector
-    process_and_visualize_data()  # Save the selected data
+    process_and_visualize_data()  # Queue the selected data
 
     # Reset the RectangleSelector for a new selection
     rect_selector.set_active(False)
     rect_selector = RectangleSelector(ax, onselect, useblit=True, interactive=True)
-
-
-
-def on_draw(event):
-    """
-    Handle the draw event on the plot.
-    This function reapplies the date formatting every time the plot is redrawn.
-    """
-    apply_date_formatting()
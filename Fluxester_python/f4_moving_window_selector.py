@@ -1,7 +1,7 @@
 import numpy as np
-from scipy.stats import pearsonr
 import tkinter as tk
-from tkinter import simpledialog, messagebox
+from tkinter import simpledialog
+from f11_time_grid import valid_window_starts, DEFAULT_MAX_GAP_SECONDS
 
 
 def get_user_window_size(default_size):
@@ -30,45 +30,63 @@ def get_user_window_size(default_size):
 
 
 
-def find_best_moving_window(data, window_size, time_col, y_axis_col):
+def _window_sums(values, window_cells):
+    # Sum of every run of window_cells consecutive values
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[window_cells:] - cumulative[:-window_cells]
+
+
+def find_best_moving_window(closure, window_size, y_axis_col, check_cancelled=None, max_gap=DEFAULT_MAX_GAP_SECONDS):
     """
-    Finds the best moving window in the dataset based on the highest correlation coefficient.
+    Finds the best moving window in the closure based on the highest correlation coefficient.
+
+    The closure must be on a regular time grid (see f11_time_grid.regularize_closure). The
+    Pearson correlation of every window over its valid samples is computed from running sums
+    of n, x, y, x², y² and xy, so all windows together cost O(n) time and memory. Windows
+    containing a gap longer than `max_gap` seconds are skipped.
 
     Args:
-        data (DataFrame): The data to search for the best window.
-        window_size (int): The size of the moving window.
-        time_col (str): The name of the time column.
+        closure (ClosureWindow): The gridded closure to search for the best window.
+        window_size (float): The length of the moving window in seconds.
         y_axis_col (str): The name of the Y-axis column.
+        check_cancelled (callable): Optional callback that raises to abort the search.
+        max_gap (float): The longest tolerated gap inside a window, in seconds.
 
     Returns:
-        DataFrame: The subset of data corresponding to the best window.
+        ClosureWindow: A view on the samples of the best window.
+
+    Raises:
+        ValueError: If no window without a long gap fits in the closure.
     """
-    
-    if len(data) < window_size:
-        # Prompt the user for a revised window size
-        new_window_size = get_user_window_size(len(data))
-
-        if new_window_size is None:
-            messagebox.showinfo("Process Terminated", "Moving window process terminated by user.")
-            return None
-        else:
-            window_size = new_window_size
-    
-    best_window_start = 0
-    best_correlation = float('-inf')
-
-    # Convert datetime to numeric for correlation calculation
-    numeric_dates = (data[time_col] - data[time_col].iloc[0]).dt.total_seconds()
-
-    for start in range(len(data) - window_size + 1):
-        window = data.iloc[start:start + window_size]
-        numeric_dates_window = numeric_dates[start:start + window_size]
-
-        # Calculate the Pearson correlation coefficient
-        correlation, _ = pearsonr(numeric_dates_window, window[y_axis_col])
-
-        if correlation > best_correlation:
-            best_correlation = correlation
-            best_window_start = start
-
-    return data.iloc[best_window_start:best_window_start + window_size]
+    step = closure.elapsed[1] - closure.elapsed[0] if len(closure) > 1 else 1.0
+    window_cells = int(round(window_size / step))
+
+    if check_cancelled is not None:
+        check_cancelled()
+
+    valid = np.ones(len(closure), dtype=bool) if closure.valid is None else closure.valid
+    y_values = closure.gases[y_axis_col]
+    valid = valid & np.isfinite(y_values)
+    candidates = valid_window_starts(valid, window_cells, int(max_gap / step))
+    if not candidates.any():
+        raise ValueError(
+            f"No {window_size:g} s window without a gap longer than {max_gap:g} s fits in the closure."
+        )
+
+    # Center both variables so the running sums stay well conditioned; invalid samples weigh zero
+    x = np.where(valid, closure.elapsed - closure.elapsed[0], 0.0)
+    y = np.where(valid, y_values - y_values[valid].mean(), 0.0)
+    n = _window_sums(valid.astype(np.float64), window_cells)
+    sum_x, sum_y = _window_sums(x, window_cells), _window_sums(y, window_cells)
+
+    # Pearson correlation of every window over its valid samples
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = _window_sums(x * y, window_cells) - sum_x * sum_y / n
+        x_spread = _window_sums(x * x, window_cells) - sum_x ** 2 / n
+        y_spread = _window_sums(y * y, window_cells) - sum_y ** 2 / n
+        correlation = covariance / np.sqrt(x_spread * y_spread)
+
+    correlation = np.where(candidates & np.isfinite(correlation), correlation, -np.inf)
+    best_window_start = int(np.argmax(correlation))
+
+    return closure.subwindow(best_window_start, best_window_start + window_cells)
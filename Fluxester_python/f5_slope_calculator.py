@@ -1,5 +1,4 @@
 import numpy as np
-import pandas as pd
 from scipy.optimize import curve_fit
 from scipy.stats import linregress
 import statsmodels.api as sm
@@ -40,33 +39,36 @@ def get_gas_threshold(gas_type, k_thresholds):
             f"Unrecognized gas type: {gas_type}. Valid types: {list(normalized_mapping.keys())}"
         )
 
-def estimate_gas_slope(gas_concentration, datetime_data, gas_type):
+def estimate_gas_slope(gas_concentration, elapsed_time, gas_type, check_cancelled=None):
     """
     Estimate the slope of gas concentration changes over time with calculated initial estimates.
 
     Parameters:
     gas_concentration (array-like): Array of gas concentration values.
-    datetime_data (array-like): Array of datetime values corresponding to the concentration measurements.
+    elapsed_time (ndarray): Elapsed seconds corresponding to the concentration measurements.
     gas_type (str): Type of gas (e.g., 'CO2', 'CH4', 'H2O', 'N2O').
+    check_cancelled (callable, optional): Called on every model evaluation; raising from it aborts the nonlinear fit.
 
     Returns:
     tuple: Contains the slope, intercept (for linear models), p-value of the slope, method used ('Linear' or 'Nonlinear'), and model parameters.
     """
-    # Convert datetime data to pandas datetime format and calculate elapsed time in seconds.
-    datetime_data = pd.to_datetime(datetime_data)
-    elapsed_time = (datetime_data - datetime_data.min()).dt.total_seconds()
+    # Measure the elapsed time from the first sample of the window.
+    elapsed_time = np.asarray(elapsed_time, dtype=np.float64)
+    elapsed_time = elapsed_time - elapsed_time.min()
 
     # Calculate C0 (initial concentration) from the intercept of the first 10 data points
     X_first_10 = sm.add_constant(elapsed_time[:10])
     Y_first_10 = gas_concentration[:10]
     linear_model_first_10 = sm.OLS(Y_first_10, X_first_10).fit()
-    C0_initial_guess = linear_model_first_10.params.iloc[0]
+    C0_initial_guess = linear_model_first_10.params[0]
 
     # Define the nonlinear model function
     def nonlinear_model(x, C0, Cmax, k, t0):
         """
         Nonlinear model for gas concentration changes over time.
         """
+        if check_cancelled is not None:
+            check_cancelled()
         exp_term = np.exp(-k * (x - t0))
         return Cmax + (C0 - Cmax) * exp_term
 
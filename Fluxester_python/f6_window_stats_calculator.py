@@ -1,32 +1,41 @@
-def calculate_window_statistics(window, gas_columns, time_col, other_cols):
+import numpy as np
+import pandas as pd
+
+
+def calculate_window_statistics(data, row_ranges, other_cols):
     """
-    Calculates statistics (slope, mean, etc.) for the specified window of data.
+    Calculates the ancillary statistics of many closure windows in one grouped operation.
+
+    The rows of every window are gathered into a single frame labelled by window number, so all
+    means and first values are computed by one groupby instead of a Python loop per window and
+    per column. Windows may overlap.
 
     Args:
-        window (DataFrame): The data window to calculate statistics for.
-        gas_columns (list): List of gas column names to calculate slopes.
-        time_col (str): The name of the time column.
-        other_cols (list): List of other columns to calculate means.
+        data (DataFrame): The rows of the closures, e.g. several selections concatenated.
+        row_ranges (list): (first, stop) row positions of each window in `data`; stop is exclusive.
+        other_cols (list): Columns to summarize. Numeric columns are averaged, text and
+            categorical columns keep their first value, and datetime columns are skipped.
 
     Returns:
-        dict: A dictionary containing calculated statistics.
+        DataFrame: One row per window, in the order of `row_ranges`. Windows without
+        any rows are filled with NaN.
     """
-    summary = {}
-    start_datetime = window[time_col].iloc[0]
-    numeric_dates = (window[time_col] - start_datetime).dt.total_seconds()
-
-    # Calculate slopes for gas columns
-    for gas_col in gas_columns:
-        if gas_col in window.columns:
-            y_values = window[gas_col].to_numpy()
-            summary[f"{gas_col}_slope"] = calculate_slope(y_values, numeric_dates)
-
-    # Calculate mean or representative value for other columns
-    for col in other_cols:
-        if col in window.columns:
-            if pd.api.types.is_numeric_dtype(window[col]):
-                summary[col] = window[col].mean(skipna=True)
-            elif pd.api.types.is_categorical_dtype(window[col]) or pd.api.types.is_object_dtype(window[col]):
-                summary[col] = window[col].iloc[0]
-
-    return summary
+    first_rows = np.array([first for first, _ in row_ranges], dtype=np.int64)
+    lengths = np.maximum(np.array([stop for _, stop in row_ranges], dtype=np.int64) - first_rows, 0)
+
+    # Expand the windows into row positions and window labels without a Python loop
+    window_ids = np.repeat(np.arange(len(row_ranges)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(first_rows, lengths) + offsets
+
+    columns = [col for col in other_cols
+               if col in data.columns and not pd.api.types.is_datetime64_any_dtype(data[col])]
+    numeric_cols = [col for col in columns if pd.api.types.is_numeric_dtype(data[col])]
+    first_cols = [col for col in columns if col not in numeric_cols]
+
+    grouped = data[columns].iloc[rows].groupby(window_ids, sort=True)
+    statistics = pd.concat(
+        [grouped[numeric_cols].mean(), grouped[first_cols].first(skipna=False)], axis=1
+    )
+
+    return statistics.reindex(index=range(len(row_ranges)), columns=columns)
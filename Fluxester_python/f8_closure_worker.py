@@ -0,0 +1,335 @@
+import os
+import queue
+import threading
+import itertools
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from f4_moving_window_selector import find_best_moving_window
+from f5_slope_calculator import estimate_gas_slope
+from f6_window_stats_calculator import calculate_window_statistics
+from f7_best_fit_model_plotter import plot_gas_with_best_window
+from f9_closure_window import ClosureWindow
+from f11_time_grid import infer_time_step, regularize_closure, window_rows, describe_time_irregularities
+from f13_dead_band_detector import detect_closure_dead_bands, closure_dead_band
+
+
+class ClosureCancelled(Exception):
+    """
+    Raised inside the worker thread when the user cancels a closure that is being processed.
+    """
+
+
+def _find_best_window(raw_closure, closure, step, dead_band, window_size, y_axis_col, check_cancelled):
+    # Search the best moving window after the dead band, explaining failures caused by irregular timestamps
+    closure_after_dead_band = closure.subwindow(int(round(dead_band / step)))
+    if len(closure_after_dead_band) < round(window_size / step):
+        # The window size prompt of f4 cannot be shown from a worker thread
+        raise ValueError("Insufficient data points after applying dead band for the moving window.")
+    try:
+        return find_best_moving_window(closure_after_dead_band, window_size, y_axis_col, check_cancelled=check_cancelled)
+    except ValueError as e:
+        irregularities = describe_time_irregularities(raw_closure.elapsed, step)
+        raise ValueError(f"{e} The closure has {irregularities['gaps']} gaps (longest "
+                         f"{irregularities['longest_gap']:g} s) and {irregularities['duplicates']} duplicated timestamps.")
+
+
+def prepare_closures(selected_frames, gas_cols, y_axis_col, dead_band, window_sizes, check_cancelled=None):
+    """
+    Runs the stages of many selected closures that come before the slope fitting.
+
+    Every closure is put on a regular time grid, its dead band is applied ('auto' detects the dead
+    bands of all closures in one batched computation) and its best moving window is searched.
+    The ancillary statistics of all best windows are then computed by a single grouped
+    calculate_window_statistics call over the raw rows of every closure.
+
+    Args:
+        selected_frames (list): The rows selected for each closure, including a 'datetime' column.
+        gas_cols (list): The names of the CO2, CH4, H2O and N2O columns (entries may be 'None').
+        y_axis_col (str): The name of the column used to find the best moving window.
+        dead_band (int or str): Number of seconds to skip at the start of every closure, or 'auto'.
+        window_sizes (list): The length of the moving window of each closure, in seconds.
+        check_cancelled (callable): Optional callback that raises ClosureCancelled when the user cancels.
+
+    Returns:
+        list: For each closure, the dict expected by fit_closure, or the exception explaining why
+        the closure cannot be processed.
+    """
+    check_cancelled = check_cancelled or (lambda: None)
+
+    # Gather the closure arrays once and put them on a regular time grid; every later stage works on views of them
+    frames, raw_closures, steps, closures = [], [], [], []
+    for selected_data in selected_frames:
+        if not selected_data['datetime'].is_monotonic_increasing:
+            selected_data = selected_data.sort_values('datetime', kind='stable')
+        raw_closure = ClosureWindow.from_frame(selected_data, 'datetime', gas_cols + [y_axis_col])
+        step = infer_time_step(raw_closure.elapsed)
+        frames.append(selected_data)
+        raw_closures.append(raw_closure)
+        steps.append(step)
+        closures.append(regularize_closure(raw_closure, step))
+
+    # Detect the end of chamber mixing of every closure and gas unless a manual dead band was given
+    if dead_band == 'auto':
+        dead_bands = detect_closure_dead_bands(closures, gas_cols)
+    else:
+        dead_bands = [{}] * len(closures)
+
+    prepared = []
+    for raw_closure, closure, step, closure_dead_bands, window_size in zip(raw_closures, closures, steps,
+                                                                            dead_bands, window_sizes):
+        check_cancelled()
+        applied_dead_band = closure_dead_band(closure_dead_bands) if dead_band == 'auto' else dead_band
+        try:
+            best_window = _find_best_window(raw_closure, closure, step, applied_dead_band, window_size,
+                                            y_axis_col, check_cancelled)
+        except ValueError as e:
+            prepared.append(e)
+            continue
+        prepared.append({
+            'raw_closure': raw_closure,
+            'best_window': best_window,
+            'best_window_rows': window_rows(raw_closure, best_window, step),
+            'dead_bands': closure_dead_bands,
+            'statistics': {},
+        })
+
+    # Ancillary statistics of the raw rows of every best window, in one grouped pass
+    finished = [position for position, closure in enumerate(prepared) if isinstance(closure, dict)]
+    if finished:
+        data = pd.concat([frames[position] for position in finished], ignore_index=True)
+        offsets = np.cumsum([0] + [len(frames[position]) for position in finished])
+        row_ranges = [(offset + prepared[position]['best_window_rows'][0], offset + prepared[position]['best_window_rows'][1])
+                      for offset, position in zip(offsets, finished)]
+        other_cols = [col for col in data.columns if col not in gas_cols + ['datetime']]
+        statistics = calculate_window_statistics(data, row_ranges, other_cols)
+        for position, closure_statistics in zip(finished, statistics.to_dict('records')):
+            prepared[position]['statistics'] = closure_statistics
+
+    return prepared
+
+
+def fit_closure(prepared, gas_cols, output_folder="./data", progress=None, check_cancelled=None):
+    """
+    Runs the slope fitting and export of one closure prepared by prepare_closures.
+
+    This function does not touch any GUI element, so it can safely be called from a
+    background thread. The figure is drawn on a standalone matplotlib Figure instead of pyplot.
+
+    Args:
+        prepared (dict or Exception): One entry of the list returned by prepare_closures; an exception is raised.
+        gas_cols (list): The names of the CO2, CH4, H2O and N2O columns (entries may be 'None').
+        output_folder (str): Folder where the figure and the summary CSV are written.
+        progress (callable): Optional callback receiving (step, total, message).
+        check_cancelled (callable): Optional callback that raises ClosureCancelled when the user cancels.
+
+    Returns:
+        dict: The summary statistics, the time range of the best window and the paths of the saved figure and summary CSV.
+    """
+    if isinstance(prepared, Exception):
+        raise prepared
+    check_cancelled = check_cancelled or (lambda: None)
+    progress = progress or (lambda step, total, message: None)
+    total_steps = len(gas_cols) + 2
+
+    raw_closure, best_window = prepared['raw_closure'], prepared['best_window']
+    summary = {f"{gas_col}_dead_band": seconds for gas_col, seconds in prepared['dead_bands'].items()}
+
+    # The raw rows that were averaged into the cells of the best window, for the figure
+    best_window_rows = raw_closure.subwindow(*prepared['best_window_rows'])
+
+    # Generate datetime strings for filenames from the time range of the best window
+    start_datetime_str = best_window.start_time.strftime('%Y%m%d%H%M%S')
+    end_datetime_str = best_window.end_time.strftime('%Y%m%d%H%M%S')
+
+    fig = Figure(figsize=(10, 12))
+    axs = fig.subplots(len(gas_cols))
+
+    # Loop through each gas column
+    for i, gas_col in enumerate(gas_cols):
+        check_cancelled()
+        progress(i + 1, total_steps, f"Fitting {gas_col}")
+        if gas_col and gas_col in best_window.gases:
+            elapsed_time, gas_concentration = best_window.valid_samples(gas_col)
+            slope, intercept, p_value, method, popt = estimate_gas_slope(
+                gas_concentration, elapsed_time, gas_col, check_cancelled=check_cancelled
+            )
+
+            # Update the summary dictionary
+            summary[f"{gas_col}_slope"] = slope
+            summary[f"{gas_col}_p_value"] = p_value
+            summary[f"{gas_col}_method"] = method
+
+            # Plot the data
+            plot_gas_with_best_window(raw_closure, best_window_rows, elapsed_time, gas_col,
+                                      slope, intercept, method, popt, axs[i])
+            axs[i].set_ylabel(f"{gas_col} Concentration")
+            axs[i].title.set_text(None)
+
+            # Show x-axis tick labels only on the last graph
+            if i != len(gas_cols) - 1:
+                axs[i].set_xticklabels([])
+
+    check_cancelled()
+    progress(total_steps - 1, total_steps, "Saving figure and summary")
+
+    # Adjust layout and save the figure
+    fig.tight_layout(pad=3.0)
+    os.makedirs(output_folder, exist_ok=True)
+    figure_path = f"{output_folder}/{start_datetime_str}_to_{end_datetime_str}_gases.png"
+    fig.savefig(figure_path)
+
+    # Additional columns, averaged over the rows of the best window by prepare_closures
+    summary.update(prepared['statistics'])
+
+    # Save the summary
+    summary_df = pd.DataFrame([summary])
+    summary_csv_path = f"{output_folder}/{start_datetime_str}_to_{end_datetime_str}_summary.csv"
+    summary_df.to_csv(summary_csv_path, index=False)
+    progress(total_steps, total_steps, "Done")
+
+    return {
+        'summary': summary,
+        'best_window': [best_window.start_time.isoformat(), best_window.end_time.isoformat()],
+        'figure_path': figure_path,
+        'summary_path': summary_csv_path,
+    }
+
+
+def compute_closure(selected_data, gas_cols, y_axis_col, dead_band, window_size,
+                    output_folder="./data", progress=None, check_cancelled=None):
+    """
+    Runs the window search, slope fitting and export for one selected closure.
+
+    Args:
+        selected_data (DataFrame): The rows selected for the closure, including a 'datetime' column.
+        gas_cols (list): The names of the CO2, CH4, H2O and N2O columns (entries may be 'None').
+        y_axis_col (str): The name of the column used to find the best moving window.
+        dead_band (int or str): Number of seconds to skip at the start of the closure, or 'auto' to detect it.
+        window_size (int): The length of the moving window in seconds.
+        output_folder (str): Folder where the figure and the summary CSV are written.
+        progress (callable): Optional callback receiving (step, total, message).
+        check_cancelled (callable): Optional callback that raises ClosureCancelled when the user cancels.
+
+    Returns:
+        dict: The result of fit_closure.
+    """
+    if progress is not None:
+        progress(0, len(gas_cols) + 2, "Searching best window")
+    prepared, = prepare_closures([selected_data], gas_cols, y_axis_col, dead_band, [window_size], check_cancelled)
+    return fit_closure(prepared, gas_cols, output_folder, progress, check_cancelled)
+
+
+class ClosureWorker:
+    """
+    Processes submitted closures one after another on a background thread.
+
+    Progress, results and errors are posted to the `results` queue as (kind, job_id, payload)
+    tuples, where kind is 'progress', 'done', 'cancelled' or 'error'. The GUI polls this queue
+    from its own event loop, so no widget is ever touched from the worker thread.
+
+    A batch of closures is submitted as one job that runs prepare_closures on all of them
+    together and then queues one fitting job per closure; its 'done' payload lists their job ids.
+    """
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self._jobs = queue.Queue()
+        self._outstanding = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(target=self._run, name="closure-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, selected_data, **params):
+        """
+        Queues a closure for processing.
+
+        Args:
+            selected_data (DataFrame): A private copy of the closure rows; it must not be modified afterwards.
+            **params: Keyword arguments forwarded to compute_closure.
+
+        Returns:
+            int: The id of the job, repeated in every message posted to `results`.
+        """
+        return self._submit(compute_closure, selected_data, params)
+
+    def submit_batch(self, selected_frames, window_sizes, **params):
+        """
+        Queues many closures at once, e.g. the closures to recompute when a project is reopened.
+
+        The dead bands, best windows and window statistics of all closures are computed together
+        by prepare_closures on the worker thread, then one fitting job is queued per closure.
+
+        Args:
+            selected_frames (list): A private copy of the rows of each closure.
+            window_sizes (list): The moving window size of each closure, in seconds.
+            **params: gas_cols, y_axis_col, dead_band and output_folder, as for compute_closure.
+
+        Returns:
+            int: The id of the batch job. Its 'done' payload is the list of the closure job ids,
+            in the order of `selected_frames`, and is posted before any message of those jobs.
+        """
+        # The closure jobs share the cancel event of the batch, so a cancel that arrives while
+        # they are being queued still reaches them
+        cancel_event = threading.Event()
+        params = dict(params, window_sizes=window_sizes, cancel_event=cancel_event)
+        return self._submit(self._queue_batch, selected_frames, params, cancel_event)
+
+    def _submit(self, task, data, params, cancel_event=None):
+        job_id = next(self._ids)
+        cancel_event = cancel_event or threading.Event()
+        with self._lock:
+            self._outstanding[job_id] = cancel_event
+        self._jobs.put((job_id, cancel_event, task, data, params))
+        return job_id
+
+    def _queue_batch(self, selected_frames, window_sizes, gas_cols, y_axis_col, dead_band, cancel_event, progress,
+                     check_cancelled, output_folder="./data"):
+        # Runs on the worker thread; the closure jobs are registered before this job is reported done
+        progress(0, 1, f"Preparing {len(selected_frames)} closures")
+        prepared = prepare_closures(selected_frames, gas_cols, y_axis_col, dead_band, window_sizes, check_cancelled)
+        check_cancelled()
+        return [self._submit(fit_closure, closure, {'gas_cols': gas_cols, 'output_folder': output_folder}, cancel_event)
+                for closure in prepared]
+
+    def cancel(self):
+        """
+        Cancels the running closure and every closure still waiting in the queue.
+        """
+        with self._lock:
+            for cancel_event in self._outstanding.values():
+                cancel_event.set()
+
+    def pending(self):
+        """
+        Returns the number of closures that are queued or running.
+        """
+        with self._lock:
+            return len(self._outstanding)
+
+    def _run(self):
+        while True:
+            job_id, cancel_event, task, data, params = self._jobs.get()
+
+            def check_cancelled():
+                if cancel_event.is_set():
+                    raise ClosureCancelled()
+
+            def progress(step, total, message):
+                self.results.put(('progress', job_id, (step, total, message)))
+
+            try:
+                check_cancelled()
+                outcome = ('done', job_id, task(data, progress=progress, check_cancelled=check_cancelled, **params))
+            except ClosureCancelled:
+                outcome = ('cancelled', job_id, None)
+            except Exception as e:
+                outcome = ('error', job_id, str(e))
+
+            # Forget the job before reporting it, so pending() is already up to date for the GUI
+            with self._lock:
+                self._outstanding.pop(job_id, None)
+            self.results.put(outcome)
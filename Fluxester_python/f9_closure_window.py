@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+class ClosureWindow:
+    """
+    Compact, array-backed view of one chamber closure (or a window inside it).
+
+    The closure holds the elapsed time in seconds since `origin` and one float array per
+    concentration column, plus an optional validity mask for closures resampled onto a regular
+    time grid. Sub-windows share the same underlying buffers: slicing only creates
+    NumPy views and records the start/stop offsets relative to the closure they were cut from
+    (raw rows, or grid cells for a gridded closure), so the dead band, the moving window search,
+    the slope fit and the plot never copy the data again.
+    """
+
+    __slots__ = ('origin', 'elapsed', 'gases', 'valid', 'start', 'stop')
+
+    def __init__(self, origin, elapsed, gases, valid=None, start=0, stop=None):
+        """
+        Args:
+            origin (numpy.datetime64): The timestamp corresponding to an elapsed time of zero.
+            elapsed (ndarray): Seconds since `origin` for every sample.
+            gases (dict): Column name -> ndarray of concentrations, aligned with `elapsed`.
+            valid (ndarray): Boolean mask of the samples holding data, or None when all of them do.
+            start (int): Offset of the first sample (row or grid cell) within the closure this window was cut from.
+            stop (int): Offset one past the last sample within that closure.
+        """
+        self.origin = origin
+        self.elapsed = elapsed
+        self.gases = gases
+        self.valid = valid
+        self.start = start
+        self.stop = start + len(elapsed) if stop is None else stop
+
+    @classmethod
+    def from_frame(cls, data, time_col, columns):
+        """
+        Builds a closure from the selected rows of the dataset.
+
+        Float columns are exposed without copying; the datetime column is converted once
+        to elapsed seconds here, instead of in every stage.
+
+        Args:
+            data (DataFrame): The rows of the closure, in chronological order.
+            time_col (str): The name of the datetime column.
+            columns (list): The concentration columns to keep. Names missing from `data` are skipped.
+
+        Returns:
+            ClosureWindow: The closure covering all rows of `data`.
+        """
+        times = data[time_col].to_numpy(dtype='datetime64[ns]')
+        origin = times[0]
+        elapsed = (times - origin) / np.timedelta64(1, 's')
+        gases = {col: data[col].to_numpy(dtype=np.float64) for col in columns if col in data.columns}
+        return cls(origin, elapsed, gases)
+
+    def __len__(self):
+        return len(self.elapsed)
+
+    def subwindow(self, start, stop=None):
+        """
+        Returns the samples [start, stop) of this window as a new window sharing the same buffers.
+
+        Args:
+            start (int): First sample, relative to this window.
+            stop (int): One past the last sample, relative to this window. Defaults to the end.
+
+        Returns:
+            ClosureWindow: A view on the requested samples.
+        """
+        stop = len(self) if stop is None else stop
+        gases = {col: values[start:stop] for col, values in self.gases.items()}
+        valid = None if self.valid is None else self.valid[start:stop]
+        return ClosureWindow(self.origin, self.elapsed[start:stop], gases, valid, self.start + start, self.start + stop)
+
+    def valid_samples(self, col):
+        """
+        Returns the elapsed seconds and values of a column, without the empty or NaN samples.
+
+        Args:
+            col (str): The concentration column.
+
+        Returns:
+            tuple: (elapsed, values); plain views when nothing needs to be dropped.
+        """
+        keep = np.isfinite(self.gases[col])
+        if self.valid is not None:
+            keep &= self.valid
+        if keep.all():
+            return self.elapsed, self.gases[col]
+        return self.elapsed[keep], self.gases[col][keep]
+
+    def relative_elapsed(self):
+        """
+        Returns the elapsed seconds since the first sample of this window.
+        """
+        return self.elapsed - self.elapsed[0]
+
+    @property
+    def datetimes(self):
+        """
+        The timestamps of the samples, e.g. for plotting.
+        """
+        return self.origin + np.rint(self.elapsed * 1e9).astype('timedelta64[ns]')
+
+    @property
+    def start_time(self):
+        """
+        The timestamp of the first sample.
+        """
+        return pd.Timestamp(self.origin + np.timedelta64(int(round(self.elapsed[0] * 1e9)), 'ns'))
+
+    @property
+    def end_time(self):
+        """
+        The timestamp of the last sample.
+        """
+        return pd.Timestamp(self.origin + np.timedelta64(int(round(self.elapsed[-1] * 1e9)), 'ns'))
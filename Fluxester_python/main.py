@@ -1,9 +1,11 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import pandas as pd
+from functools import partial
 from f1_file_selector import select_file
 from f2_column_selector_ui import create_column_selection_ui
 from f3_data_plotting import process_columns
+from f12_analyzer_reader import AnalyzerFile, detect_analyzer_layout, read_analyzer_file
 
 def read_file(file_path):
     """Reads a file and returns a pandas DataFrame based on its type."""
@@ -32,10 +34,37 @@ def read_file(file_path):
         return None
 
 
+def process_analyzer_file(file_path):
+    """
+    Passes a native LGR, LI-COR or Picarro export to the column selection UI.
+    Only the header is read at first; the memory-mapped reader then parses the selected columns
+    and the other numeric columns (temperatures, pressures, ...) kept for the window statistics.
+    """
+    with AnalyzerFile(file_path) as analyzer_file:
+        header = pd.DataFrame(columns=['date', 'time'] + analyzer_file.value_columns)
+        numeric_cols = analyzer_file.numeric_columns()
+
+    def read_selected_columns(df, date_col, time_col, y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, dead_band):
+        selected = [col for col in (y_axis_col, co2_col, ch4_col, h2o_col, n2o_col) if col in header.columns[2:]]
+        try:
+            data = read_analyzer_file(file_path, columns=selected + numeric_cols)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read the file: {e}")
+            return
+        process_columns(data, date_col, time_col, y_axis_col, co2_col, ch4_col, h2o_col, n2o_col, dead_band,
+                        input_path=file_path)
+
+    create_column_selection_ui(header, read_selected_columns)
+
+
 # Function to process the selected file
 def process_file(file_path):
     """Processes the selected file and passes data to the column selection UI."""
     try:
+        if detect_analyzer_layout(file_path):
+            process_analyzer_file(file_path)
+            return
+
         # Read the selected file
         data = read_file(file_path)
 
@@ -47,8 +76,8 @@ def process_file(file_path):
             messagebox.showerror("Error", "The selected file contains only headers without data.")
             return  # Exit the function if the DataFrame is effectively empty
 
-        # Call the next step in the pipeline
-        create_column_selection_ui(data, process_columns)
+        # Call the next step in the pipeline; the file path lets it reload the project manifest
+        create_column_selection_ui(data, partial(process_columns, input_path=file_path))
     except Exception as e:
         messagebox.showerror("Error", f"Failed to process the file: {e}")
 
@@ -58,7 +87,8 @@ def open_file():
     file_path = filedialog.askopenfilename(
         title="Open File",
         initialdir="./",  # Set a default initial directory
-        filetypes=(("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("Text files", "*.txt"))
+        filetypes=(("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("Text files", "*.txt"),
+                   ("Analyzer files", "*.txt *.data *.dat"))
     )
     if file_path:
         app.destroy()  # Close the start window
@@ -118,7 +148,7 @@ description_label = ctk.CTkLabel(
     text=(
         "Author: Md Abdul Halim [2025]\n"
         "Licensed under: CC BY-NC 4.0\n"
-        "Supported file types: TXT, CSV, and Excel\n"
+        "Supported file types: TXT, CSV, Excel, and LGR/LI-COR/Picarro exports\n"
         "Method details: https://doi.org/10.1016/j.scitotenv.2024.172666"
     ),
     font=("Arial", 12),
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules are flat scripts next to main.py and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from f9_closure_window import ClosureWindow
+
+
+@pytest.fixture
+def origin():
+    return np.datetime64('2024-06-01T10:00:00', 'ns')
+
+
+@pytest.fixture
+def make_closure(origin):
+    # Builds a closure starting at `origin` from elapsed seconds and one array per gas column
+    def make(elapsed, valid=None, **gases):
+        gases = {col: np.asarray(values, dtype=np.float64) for col, values in gases.items()}
+        return ClosureWindow(origin, np.asarray(elapsed, dtype=np.float64), gases, valid)
+    return make
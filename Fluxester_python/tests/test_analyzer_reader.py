@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import f12_analyzer_reader
+from f12_analyzer_reader import AnalyzerFile, _parse_fixed_width_times, detect_analyzer_layout, read_analyzer_file
+
+TIMES = pd.date_range('2024-06-01 10:00:00.250', periods=6, freq='1s')
+
+
+def write_lgr(path, times=TIMES):
+    lines = ["VC:2f90039 BD:Jan 16 2014 SN:12-3456", "Time,[CH4]_ppm,[CO2]_ppm,GasT_C"]
+    lines += [f"  {time:%m/%d/%Y %H:%M:%S.%f}"[:-3] + f",{2 + i / 10:.3f},{400 + i},{30.5}" for i, time in enumerate(times)]
+    lines += ["-----BEGIN PGP MESSAGE-----", "jA0ECQMC4x1Wd", "-----END PGP MESSAGE-----"]
+    path.write_bytes(("\r\n".join(lines) + "\r\n").encode())
+    return str(path)
+
+
+def write_licor(path):
+    lines = ["Model:\tLI-7810 CH4/CO2/H2O Trace Gas Analyzer", "SN:\tTG10-01000",
+             "DATAH\tSECONDS\tNANOSECONDS\tDIAG\tREMARK\tDATE\tTIME\tCO2\tCH4",
+             "DATAU\ts\tns\t\t\tdate\ttime\tppm\tppb"]
+    for i, time in enumerate(TIMES):
+        remark = "chamber 1" if i == 2 else ""
+        lines.append(f"DATA\t{i}\t0\t0\t{remark}\t{time:%Y-%m-%d}\t{time:%H:%M:%S}\t{400 + i}\t{2000 + i}")
+        if i in (1, 3):
+            lines += ["", "REMARK\tlid opened"]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def write_picarro(path, width=26):
+    columns = ["DATE", "TIME", "FRAC_DAYS_SINCE_JAN1", "CO2", "CH4", "ALARM_STATUS"]
+    lines = ["".join(f"{col:<{width}}" for col in columns)]
+    for i, time in enumerate(TIMES):
+        values = [f"{time:%Y-%m-%d}", f"{time:%H:%M:%S.%f}"[:-3], "152.416", f"{400.5 + i}", "2.01", "OK"]
+        lines.append("".join(f"{value:<{width}}" for value in values))
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_lgr_rows_stop_at_the_signature_footer(tmp_path):
+    path = write_lgr(tmp_path / "lgr.txt")
+    assert detect_analyzer_layout(path) == 'LGR'
+    with AnalyzerFile(path) as analyzer_file:
+        assert analyzer_file.columns == ['Time', '[CH4]_ppm', '[CO2]_ppm', 'GasT_C']
+        assert len(analyzer_file) == len(TIMES)
+        times, values = analyzer_file.read(['[CO2]_ppm'])
+    np.testing.assert_array_equal(times, TIMES.to_numpy())
+    np.testing.assert_array_equal(values['[CO2]_ppm'], 400 + np.arange(6.0))
+
+
+def test_licor_skips_units_blank_and_remark_lines(tmp_path):
+    path = write_licor(tmp_path / "licor.data")
+    assert detect_analyzer_layout(path) == 'LI-COR'
+    with AnalyzerFile(path) as analyzer_file:
+        assert len(analyzer_file) == len(TIMES)
+        assert analyzer_file.value_columns == ['SECONDS', 'NANOSECONDS', 'DIAG', 'CO2', 'CH4']
+        # Rows 1-4 are not contiguous in the file, so only the indexed rows may be parsed
+        times, values = analyzer_file.read(['CO2', 'CH4'], TIMES[1].floor('s'), TIMES[4].floor('s'))
+    np.testing.assert_array_equal(times, TIMES[1:5].floor('s').to_numpy())
+    np.testing.assert_array_equal(values['CH4'], [2001.0, 2002.0, 2003.0, 2004.0])
+
+
+def test_picarro_fields_are_cut_at_the_header_offsets(tmp_path):
+    path = write_picarro(tmp_path / "picarro.dat")
+    assert detect_analyzer_layout(path) == 'Picarro'
+    with AnalyzerFile(path) as analyzer_file:
+        assert analyzer_file._slice_fields(0, len(analyzer_file), ['CO2']) is not None
+        assert analyzer_file.numeric_columns() == ['FRAC_DAYS_SINCE_JAN1', 'CO2', 'CH4']
+
+    data = read_analyzer_file(path, ['CO2', 'CH4'])
+    assert list(data.columns) == ['datetime', 'CO2', 'CH4']
+    np.testing.assert_array_equal(data['datetime'].to_numpy(), TIMES.to_numpy())
+    np.testing.assert_array_equal(data['CO2'], 400.5 + np.arange(6.0))
+
+
+def test_picarro_values_wider_than_their_column_are_tokenized(tmp_path):
+    # The first value of FRAC_DAYS_SINCE_JAN1 runs past the start of the CO2 column; rows keep their length
+    path = tmp_path / "picarro.dat"
+    write_picarro(path)
+    text = path.read_text()
+    field = "152.416" + " " * 19 + "400.5" + " " * 21
+    path.write_text(text.replace(field, "152.41600000000000000000000 400.5" + " " * 19, 1))
+    with AnalyzerFile(str(path)) as analyzer_file:
+        assert analyzer_file._slice_fields(0, len(analyzer_file), ['CO2']) is None
+        times, values = analyzer_file.read(['FRAC_DAYS_SINCE_JAN1', 'CO2'])
+    np.testing.assert_array_equal(times, TIMES.to_numpy())
+    np.testing.assert_allclose(values['FRAC_DAYS_SINCE_JAN1'], 152.416, atol=1e-5)
+    np.testing.assert_array_equal(values['CO2'], 400.5 + np.arange(6.0))
+
+
+def test_newline_scan_in_small_chunks_finds_the_same_rows(tmp_path, monkeypatch):
+    path = write_licor(tmp_path / "licor.data")
+    with AnalyzerFile(path) as analyzer_file:
+        expected = analyzer_file._row_starts.copy(), analyzer_file._row_ends.copy()
+    monkeypatch.setattr(f12_analyzer_reader, '_NEWLINE_SCAN_BYTES', 7)
+    with AnalyzerFile(path) as analyzer_file:
+        np.testing.assert_array_equal(analyzer_file._row_starts, expected[0])
+        np.testing.assert_array_equal(analyzer_file._row_ends, expected[1])
+
+
+def test_fixed_width_times_fall_back_to_pandas():
+    parts = _parse_fixed_width_times(np.array([b' 07/29/2019 00:00:01.500  ', b' 12/31/2019 23:59:59.000  ']),
+                                     '%m/%d/%Y %H:%M:%S.%f')
+    assert parts['%m'].tolist() == [7, 12] and parts['%f'].tolist() == [500_000_000, 0]
+
+    # Unpadded months and out-of-range fields are left to pandas
+    assert _parse_fixed_width_times(np.array([b'7/29/2019 00:00:01.5', b'12/31/2019 23:59:59.0']),
+                                    '%m/%d/%Y %H:%M:%S.%f') is None
+    assert _parse_fixed_width_times(np.array([b'13/29/2019 00:00:01.5']), '%m/%d/%Y %H:%M:%S.%f') is None
+
+
+def test_irregular_timestamps_are_parsed_by_pandas(tmp_path):
+    times = pd.DatetimeIndex(['2024-06-01 09:59:59.5', '2024-06-01 10:00:00.5', '2024-06-01 10:00:01.5'])
+    path = tmp_path / "lgr.txt"
+    write_lgr(path, times)
+    path.write_bytes(path.read_bytes().replace(b"  06/01/2024 09:", b"  6/1/2024 09:"))
+    with AnalyzerFile(str(path)) as analyzer_file:
+        read_times, _ = analyzer_file.read(['[CO2]_ppm'])
+    np.testing.assert_array_equal(read_times, times.to_numpy())
+
+
+def test_find_rows_at_the_range_edges(tmp_path):
+    path = write_lgr(tmp_path / "lgr.txt")
+    with AnalyzerFile(path) as analyzer_file:
+        assert analyzer_file.find_rows() == (0, 6)
+        assert analyzer_file.find_rows(TIMES[0] - pd.Timedelta('1h'), TIMES[-1] + pd.Timedelta('1h')) == (0, 6)
+        assert analyzer_file.find_rows(TIMES[0], TIMES[0]) == (0, 1)
+        assert analyzer_file.find_rows(TIMES[-1], None) == (5, 6)
+        assert analyzer_file.find_rows(TIMES[1] + pd.Timedelta('1ms'), TIMES[3]) == (2, 4)
+        assert analyzer_file.find_rows(TIMES[-1] + pd.Timedelta('1s')) == (6, 6)
+        assert analyzer_file.find_rows(None, TIMES[0] - pd.Timedelta('1s')) == (0, 0)
+        times, values = analyzer_file.read(['[CO2]_ppm'], TIMES[-1] + pd.Timedelta('1s'))
+    assert len(times) == 0 and len(values['[CO2]_ppm']) == 0
+
+
+def test_header_only_file_is_rejected_and_closed(tmp_path):
+    path = tmp_path / "licor.data"
+    path.write_text("Model:\tLI-7810\nDATAH\tDATE\tTIME\tCO2\nDATAU\tdate\ttime\tppm\n")
+    with pytest.raises(ValueError, match="only headers"):
+        AnalyzerFile(str(path))
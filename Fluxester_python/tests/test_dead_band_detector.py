@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from f13_dead_band_detector import closure_dead_band, detect_dead_bands, parse_dead_band
+
+
+@pytest.fixture
+def mixing_closure(make_closure):
+    # Flat, noisy mixing phase followed by a linear rise
+    def make(dead_band, duration=180, noise=0.2, seed=0):
+        rng = np.random.default_rng(seed)
+        elapsed = np.arange(float(duration))
+        co2 = 420 + 0.5 * np.maximum(elapsed - dead_band, 0) + rng.normal(0, noise, duration)
+        co2[:dead_band] += rng.normal(0, 3, dead_band)
+        return make_closure(elapsed, valid=np.ones(duration, dtype=bool), co2=co2)
+    return make
+
+
+def test_detects_the_end_of_mixing_per_closure(mixing_closure):
+    true_dead_bands = [0, 12, 25, 40]
+    closures = [mixing_closure(dead_band, seed=seed) for seed, dead_band in enumerate(true_dead_bands)]
+    detected = detect_dead_bands(closures, ['co2'])[:, 0]
+    assert detected[0] == 0
+    np.testing.assert_allclose(detected, true_dead_bands, atol=5)
+
+
+def test_missing_gas_and_short_closure_give_nan(make_closure, mixing_closure):
+    closures = [mixing_closure(10), make_closure(np.arange(5.0), co2=np.arange(5.0))]
+    detected = detect_dead_bands(closures, ['co2', 'ch4'])
+    assert np.isnan(detected[:, 1]).all()
+    assert np.isnan(detected[1, 0])
+
+
+def test_invalid_cells_are_ignored(mixing_closure):
+    closure = mixing_closure(20, seed=3)
+    closure.valid[50:53] = False
+    closure.gases['co2'][50:53] = np.nan
+    assert abs(detect_dead_bands([closure], ['co2'])[0, 0] - 20) <= 3
+
+
+def test_closure_dead_band_uses_the_longest_gas():
+    assert closure_dead_band({'co2': 12.0, 'ch4': 20.0, 'h2o': np.nan}) == 20.0
+    assert closure_dead_band({'co2': np.nan}) == 0.0
+
+
+@pytest.mark.parametrize('value, expected', [('auto', 'auto'), (' Auto ', 'auto'), ('15', 15), (30, 30)])
+def test_parse_dead_band(value, expected):
+    assert parse_dead_band(value) == expected
@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from f10_project_manifest import (closure_fingerprint, get_manifest_path, load_manifest, new_manifest,
+                                  plan_recompute, save_manifest, select_closure_rows)
+
+COLUMNS = {'date': 'date', 'time': 'time', 'y_axis': 'co2', 'co2': 'co2', 'ch4': 'ch4', 'h2o': 'None', 'n2o': 'None'}
+SELECTIONS = [
+    [['2024-06-01T10:00:00', '2024-06-01T10:01:59', 0, 1000]],
+    [['2024-06-01T10:05:00', '2024-06-01T10:06:59', 0, 1000]],
+    [['2024-06-01T10:10:00', '2024-06-01T10:11:59', 0, 1000]],
+]
+
+
+@pytest.fixture
+def project(tmp_path):
+    # A data file, its dataset and a manifest with one finished, one failed and one unfinished closure
+    input_path = tmp_path / "gas_log.csv"
+    input_path.write_text("placeholder for the file hash\n")
+    times = pd.date_range('2024-06-01 10:00:00', periods=900, freq='1s')
+    df = pd.DataFrame({'datetime': times, 'co2': 400 + np.arange(900) * 0.1, 'ch4': 2.0})
+
+    manifest = new_manifest(str(input_path), COLUMNS, 10)
+    for selections, results, error in zip(SELECTIONS, [{'summary': {}}, None, None], [None, "No window", None]):
+        selected_data = df.loc[select_closure_rows(df, selections, 'co2')]
+        manifest['closures'].append({
+            'selections': selections,
+            'window_size': 35,
+            'fingerprint': closure_fingerprint(selected_data, COLUMNS, 10, 35),
+            'results': results,
+            'error': error,
+        })
+    return str(input_path), df, manifest
+
+
+def test_manifest_path_depends_on_the_absolute_input_path(tmp_path):
+    first = get_manifest_path(str(tmp_path / "a" / "gas_log.txt"), "out")
+    second = get_manifest_path(str(tmp_path / "b" / "gas_log.txt"), "out")
+    assert first != second
+    assert os.path.basename(first).startswith("gas_log.txt.") and first.endswith(".manifest.json")
+    assert get_manifest_path(str(tmp_path / "a" / "gas_log.txt"), "out") == first
+
+
+def test_missing_values_are_saved_as_null(tmp_path, project):
+    input_path, _, manifest = project
+    manifest['closures'][0]['results'] = {'summary': {
+        'co2_slope': np.float64(0.1), 'ch4_slope': np.float64('nan'), 'h2o_slope': float('inf'),
+        'count': np.int64(35), 'first_time': pd.NaT, 'last_time': pd.Timestamp('2024-06-01 10:01:00'),
+        'remark': pd.NA, 'values': [np.nan, 1.5],
+    }}
+    manifest_path = str(tmp_path / "data" / "gas_log.csv.manifest.json")
+    save_manifest(manifest, manifest_path)
+
+    with open(manifest_path) as file:
+        # Strict JSON: NaN and Infinity are not accepted
+        json.load(file, parse_constant=lambda name: pytest.fail(f"{name} written to the manifest"))
+    summary = load_manifest(manifest_path)['closures'][0]['results']['summary']
+    assert summary == {'co2_slope': 0.1, 'ch4_slope': None, 'h2o_slope': None, 'count': 35, 'first_time': None,
+                       'last_time': '2024-06-01T10:01:00', 'remark': None, 'values': [None, 1.5]}
+    assert not os.path.exists(f"{manifest_path}.tmp")
+
+
+def test_unchanged_project_only_recomputes_unfinished_closures(project):
+    input_path, df, manifest = project
+    stale = plan_recompute(manifest, df, input_path, COLUMNS, 10)
+    # The failed closure keeps its error until its data or parameters change
+    assert [position for position, _, _ in stale] == [2]
+
+
+def test_changed_dead_band_recomputes_every_closure(project):
+    input_path, df, manifest = project
+    stale = plan_recompute(manifest, df, input_path, COLUMNS, 'auto')
+    assert [position for position, _, _ in stale] == [0, 1, 2]
+    assert manifest['dead_band'] == 'auto'
+    assert stale[1][2] != manifest['closures'][1]['fingerprint']
+
+
+def test_changed_column_mapping_recomputes_every_closure(project):
+    input_path, df, manifest = project
+    columns = dict(COLUMNS, ch4='None')
+    stale = plan_recompute(manifest, df, input_path, columns, 10)
+    assert [position for position, _, _ in stale] == [0, 1, 2]
+    assert manifest['columns'] == columns
+
+
+def test_changed_file_recomputes_only_the_closures_whose_rows_changed(project):
+    input_path, df, manifest = project
+    with open(input_path, 'a') as file:
+        file.write("edited\n")
+    df.loc[df['datetime'] == pd.Timestamp('2024-06-01 10:05:30'), 'ch4'] = 2.5
+    stale = plan_recompute(manifest, df, input_path, COLUMNS, 10)
+    assert [position for position, _, _ in stale] == [1, 2]
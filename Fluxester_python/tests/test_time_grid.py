@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from f11_time_grid import infer_time_step, regularize_closure, valid_window_starts, window_rows
+
+
+@pytest.fixture
+def rising_closure(make_closure):
+    return lambda elapsed: make_closure(elapsed, co2=400 + 0.5 * np.asarray(elapsed))
+
+
+def test_jittered_1hz_keeps_one_sample_per_cell(rising_closure):
+    rng = np.random.default_rng(0)
+    elapsed = np.arange(120) + rng.uniform(-0.05, 0.05, 120)
+    elapsed -= elapsed[0]
+
+    assert infer_time_step(elapsed) == 1.0
+    grid = regularize_closure(rising_closure(elapsed))
+    assert len(grid) == 120
+    assert grid.valid.all()
+    np.testing.assert_allclose(grid.gases['co2'], 400 + 0.5 * elapsed)
+
+
+def test_dropped_seconds_leave_empty_cells(rising_closure):
+    rng = np.random.default_rng(1)
+    seconds = np.arange(300)
+    kept = np.sort(np.concatenate(([0], rng.choice(seconds[1:], size=239, replace=False))))
+    elapsed = kept.astype(np.float64)
+
+    assert infer_time_step(elapsed) == 1.0
+    grid = regularize_closure(rising_closure(elapsed))
+    assert len(grid) == kept[-1] + 1
+    assert grid.valid.sum() == len(kept)
+    np.testing.assert_array_equal(np.flatnonzero(grid.valid), kept)
+
+
+def test_mixed_rates_use_the_rate_holding_most_samples(rising_closure):
+    # Mostly 1 Hz with a short 10 Hz burst: the burst is averaged into 1 s cells
+    slow = np.arange(0.0, 100.0)
+    burst = 100.0 + np.arange(50) * 0.1
+    elapsed = np.concatenate((slow, burst, 105.0 + np.arange(60.0)))
+    assert infer_time_step(elapsed) == 1.0
+    grid = regularize_closure(rising_closure(elapsed))
+    assert len(grid) == 165
+    assert grid.valid.all()
+
+    # Mostly 10 Hz with 1 Hz stretches: every sample keeps its own cell
+    fast = np.arange(600) * 0.1
+    elapsed = np.concatenate((fast, 60.0 + np.arange(30.0)))
+    assert infer_time_step(elapsed) == 0.1
+    grid = regularize_closure(rising_closure(elapsed))
+    assert grid.valid.sum() == len(elapsed)
+
+
+def test_duplicated_timestamps_are_averaged(make_closure):
+    elapsed = np.array([0.0, 1.0, 1.0, 2.0, 3.0])
+    closure = make_closure(elapsed, co2=[1.0, 2.0, 4.0, 5.0, 6.0])
+    grid = regularize_closure(closure)
+    np.testing.assert_array_equal(grid.gases['co2'], [1.0, 3.0, 5.0, 6.0])
+
+
+def test_window_rows_match_cells(rising_closure):
+    rng = np.random.default_rng(2)
+    elapsed = np.arange(60) + rng.uniform(-0.3, 0.3, 60)
+    elapsed -= elapsed[0]
+    closure = rising_closure(elapsed)
+    step = infer_time_step(elapsed)
+    window = regularize_closure(closure, step).subwindow(10, 45)
+    assert window_rows(closure, window, step) == (10, 45)
+
+
+def test_valid_window_starts_skip_long_gaps():
+    valid = np.ones(30, dtype=bool)
+    valid[10:17] = False  # Gap of 7 cells
+    starts = valid_window_starts(valid, 10, max_gap_cells=5)
+    assert starts[:1].all() and not starts[1:17].any() and starts[17:].all()
+
+    # A tolerated gap is allowed inside the window, but never at its ends
+    np.testing.assert_array_equal(np.flatnonzero(valid_window_starts(valid, 10, max_gap_cells=7)),
+                                  [0, 8, 9, 17, 18, 19, 20])
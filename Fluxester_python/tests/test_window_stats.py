@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from f6_window_stats_calculator import calculate_window_statistics
+from f8_closure_worker import prepare_closures
+
+
+def test_overlapping_and_empty_ranges():
+    data = pd.DataFrame({
+        'temp': np.arange(10.0),
+        'site': [f"plot {i}" for i in range(10)],
+        'chamber': pd.Categorical(['A'] * 5 + ['B'] * 5),
+        'datetime': pd.date_range('2024-06-01', periods=10, freq='1s'),
+    })
+    statistics = calculate_window_statistics(data, [(0, 4), (2, 6), (7, 7), (5, 10)], ['temp', 'site', 'chamber', 'datetime'])
+
+    # Datetime columns are skipped; numeric columns are averaged, the others keep their first value
+    assert list(statistics.columns) == ['temp', 'site', 'chamber']
+    np.testing.assert_array_equal(statistics['temp'], [1.5, 3.5, np.nan, 7.0])
+    assert statistics.loc[[0, 1, 3], 'site'].tolist() == ['plot 0', 'plot 2', 'plot 5']
+    assert statistics.loc[[0, 1, 3], 'chamber'].tolist() == ['A', 'A', 'B']
+    # The empty window is a row of NaN
+    assert statistics.iloc[2].isna().all()
+
+
+def test_missing_columns_and_no_ranges():
+    data = pd.DataFrame({'temp': [1.0, 2.0]})
+    statistics = calculate_window_statistics(data, [], ['temp', 'absent'])
+    assert statistics.empty and list(statistics.columns) == ['temp']
+
+
+def test_prepare_closures_maps_window_rows_across_frames():
+    rng = np.random.default_rng(0)
+    frames = []
+    for number, duration in enumerate([150, 180, 120]):
+        elapsed = np.arange(duration) + rng.uniform(-0.2, 0.2, duration)
+        elapsed[0] = 0.0
+        co2 = 420 + 0.3 * elapsed + rng.normal(0, 0.5, duration)
+        co2[60:95] = 420 + 1.0 * elapsed[60:95]  # The only perfectly linear stretch of every closure
+        frames.append(pd.DataFrame({
+            'datetime': pd.Timestamp('2024-06-01 10:00') + pd.Timedelta(hours=number) + pd.to_timedelta(elapsed, unit='s'),
+            'co2': co2,
+            # Unique per row, so a window mean identifies the rows it was computed from
+            'row': number * 1000 + np.arange(duration, dtype=float),
+        }))
+
+    prepared = prepare_closures(frames, ['co2'], 'co2', 10, [35, 35, 35])
+    for number, closure in enumerate(prepared):
+        first, stop = closure['best_window_rows']
+        assert (first, stop) == (60, 95)
+        assert closure['statistics']['row'] == frames[number]['row'].iloc[first:stop].mean()